@@ -2,56 +2,45 @@
 """
 Simple chat client for WriteSense Agent API
 """
-import requests
-import json
+import asyncio
 import sys
+import threading
+from collections import OrderedDict
+
+import aiohttp
+
+# Prefer orjson for request bodies and streamed frames; both parsers accept bytes
+try:
+    from orjson import dumps, loads
+except ImportError:
+    from json import dumps, loads
+
+# Optional incremental JSON parser for long conversation histories
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # Configuration
 API_BASE = "http://localhost:8123"
 ASSISTANT_ID = "agent"
 
-def create_thread():
-    """Create a new conversation thread"""
-    response = requests.post(f"{API_BASE}/threads", json={})
-    if response.status_code == 200:
-        return response.json()["thread_id"]
-    else:
-        print(f"Error creating thread: {response.text}")
-        return None
-
-def send_message(thread_id, message):
-    """Send a message and get response"""
-    payload = {
-        "assistant_id": ASSISTANT_ID,
-        "input": {
-            "messages": [
-                {
-                    "role": "human",
-                    "content": message
-                }
-            ]
-        }
-    }
-    
-    response = requests.post(
-        f"{API_BASE}/threads/{thread_id}/runs/wait",
-        json=payload,
-        headers={"Content-Type": "application/json"}
+# Recent answers keyed by (thread_id, message); only consulted when /cache is on
+ANSWER_CACHE = OrderedDict()
+ANSWER_CACHE_SIZE = 128
+
+def create_session():
+    """Create the shared HTTP session so connections are kept alive between turns"""
+    connector = aiohttp.TCPConnector(limit=8, keepalive_timeout=60)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={"Content-Type": "application/json"},
+        timeout=aiohttp.ClientTimeout(total=None),
     )
-    
-    if response.status_code == 200:
-        data = response.json()
-        # Get the last AI message
-        for msg in reversed(data["messages"]):
-            if msg["type"] == "ai":
-                return msg["content"]
-        return "No response received"
-    else:
-        return f"Error: {response.text}"
 
-def stream_message(thread_id, message):
-    """Send a message and stream the response"""
-    payload = {
+def build_payload(message):
+    """Build and serialize the streaming request body for a user message"""
+    return dumps({
         "assistant_id": ASSISTANT_ID,
         "input": {
             "messages": [
@@ -62,70 +51,177 @@ def stream_message(thread_id, message):
             ]
         },
         "stream_mode": "updates"
-    }
-    
-    response = requests.post(
+    })
+
+async def create_thread(session):
+    """Create a new conversation thread"""
+    async with session.post(f"{API_BASE}/threads", json={}) as response:
+        if response.status == 200:
+            return (await response.json())["thread_id"]
+        else:
+            print(f"Error creating thread: {await response.text()}")
+            return None
+
+async def iter_sse_data(response):
+    """Yield the payload of each SSE data line, splitting raw chunks on newlines"""
+    pending = b""
+    async for chunk in response.content.iter_any():
+        lines = chunk.split(b"\n")
+        lines[0] = pending + lines[0]
+        pending = lines.pop()
+        for line in lines:
+            if line.startswith(b"data: "):
+                yield line[6:]
+    if pending.startswith(b"data: "):
+        yield pending[6:]
+
+async def run_message(session, thread_id, message):
+    """Send a message on the streaming endpoint and yield (message_id, delta) pairs"""
+    async with session.post(
         f"{API_BASE}/threads/{thread_id}/runs/stream",
-        json=payload,
-        headers={"Content-Type": "application/json"},
-        stream=True
-    )
-    
-    if response.status_code == 200:
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    try:
-                        data = json.loads(line[6:])  # Remove 'data: ' prefix
-                        if 'agent' in data and 'messages' in data['agent']:
-                            for msg in data['agent']['messages']:
-                                if msg['type'] == 'ai':
-                                    return msg['content']
-                    except json.JSONDecodeError:
-                        continue
-    return "No response received"
-
-def get_thread_history(thread_id):
+        data=build_payload(message),
+    ) as response:
+        if response.status != 200:
+            yield None, f"Error: {await response.text()}"
+            return
+
+        # Length of content already emitted, keyed by message id
+        emitted = {}
+        # Messages without an id are complete in each update frame, so each gets its own key
+        anonymous = 0
+        # Chunked SSE body is read incrementally without blocking the loop
+        async for payload in iter_sse_data(response):
+            try:
+                data = loads(payload)
+            except ValueError:
+                continue
+            if not isinstance(data, dict) or 'messages' not in data.get('agent', {}):
+                continue
+            for msg in data['agent']['messages']:
+                if msg['type'] != 'ai' or not isinstance(msg['content'], str):
+                    continue
+                content = msg['content']
+                message_id = msg.get('id')
+                if message_id is None:
+                    anonymous += 1
+                    if content:
+                        yield f"anonymous-{anonymous}", content
+                    continue
+                sent = emitted.get(message_id, 0)
+                if len(content) > sent:
+                    emitted[message_id] = len(content)
+                    yield message_id, content[sent:]
+
+async def send_message(session, thread_id, message, use_cache=False):
+    """Send a message and get response"""
+    key = (thread_id, message)
+    if use_cache and key in ANSWER_CACHE:
+        ANSWER_CACHE.move_to_end(key)
+        return ANSWER_CACHE[key]
+
+    # Assemble each AI message from its deltas; the last one is the answer
+    parts = {}
+    async for message_id, delta in run_message(session, thread_id, message):
+        parts.setdefault(message_id, []).append(delta)
+    if not parts:
+        return "No response received"
+
+    message_id, deltas = list(parts.items())[-1]
+    answer = "".join(deltas)
+    if use_cache and message_id is not None:
+        ANSWER_CACHE[key] = answer
+        if len(ANSWER_CACHE) > ANSWER_CACHE_SIZE:
+            ANSWER_CACHE.popitem(last=False)
+    return answer
+
+async def stream_message(session, thread_id, message):
+    """Send a message and yield the response text as it arrives"""
+    received = False
+    async for _, delta in run_message(session, thread_id, message):
+        received = True
+        yield delta
+
+    if not received:
+        yield "No response received"
+
+async def iter_thread_history(session, thread_id):
+    """Yield conversation history messages as they are read from the response"""
+    async with session.get(f"{API_BASE}/threads/{thread_id}/state") as response:
+        if response.status != 200:
+            return
+        if ijson is None:
+            data = await response.json()
+            for msg in data["values"]["messages"]:
+                yield msg
+            return
+        async for msg in ijson.items_async(response.content, "values.messages.item"):
+            yield msg
+
+async def get_thread_history(session, thread_id):
     """Get the conversation history"""
-    response = requests.get(f"{API_BASE}/threads/{thread_id}/state")
-    if response.status_code == 200:
-        data = response.json()
-        return data["values"]["messages"]
-    return []
+    return [msg async for msg in iter_thread_history(session, thread_id)]
 
-def main():
+async def ainput(prompt):
+    """Read a line from stdin without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(setter, value):
+        if not future.done():
+            setter(value)
+
+    def read():
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(resolve, future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(resolve, future.set_result, line)
+
+    # Daemon thread so a pending input() never keeps the process alive on exit
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+async def chat():
+    async with create_session() as session:
+        # Start creating the initial thread while the banner is printed
+        thread_task = asyncio.create_task(create_thread(session))
+        await asyncio.sleep(0)
+        await run_repl(session, thread_task)
+
+async def run_repl(session, thread_task):
     print("🤖 WriteSense Agent Chat Client")
     print("================================")
     print("Commands:")
     print("  /new    - Start a new conversation")
     print("  /stream - Toggle streaming mode")
     print("  /history - Show conversation history")
+    print("  /cache  - Toggle reuse of answers to repeated messages")
     print("  /quit   - Exit the chat")
     print("================================\n")
-    
-    # Create initial thread
-    thread_id = create_thread()
+
+    thread_id = await thread_task
     if not thread_id:
         print("Failed to create thread. Exiting.")
         return
-    
+
     print(f"💬 Started new conversation (Thread: {thread_id[:8]}...)")
-    
+
     streaming = False
-    
+    caching = False
+
     while True:
         try:
-            user_input = input("\n👤 You: ").strip()
-            
+            user_input = (await ainput("\n👤 You: ")).strip()
+
             if not user_input:
                 continue
-                
+
             if user_input == "/quit":
                 print("👋 Goodbye!")
                 break
             elif user_input == "/new":
-                thread_id = create_thread()
+                thread_id = await create_thread(session)
                 if thread_id:
                     print(f"💬 Started new conversation (Thread: {thread_id[:8]}...)")
                 continue
@@ -133,29 +229,42 @@ def main():
                 streaming = not streaming
                 print(f"🔄 Streaming mode: {'ON' if streaming else 'OFF'}")
                 continue
+            elif user_input == "/cache":
+                caching = not caching
+                print(f"🗂️ Answer cache: {'ON' if caching else 'OFF'}")
+                continue
             elif user_input == "/history":
-                history = get_thread_history(thread_id)
-                print("\n📜 Conversation History:")
-                for i, msg in enumerate(history, 1):
+                # Keep only the truncated lines and write them in one call
+                lines = []
+                async for msg in iter_thread_history(session, thread_id):
                     role = "👤" if msg["type"] == "human" else "🤖"
-                    print(f"{i}. {role} {msg['content'][:100]}{'...' if len(msg['content']) > 100 else ''}")
+                    content = msg["content"]
+                    lines.append(f"{len(lines) + 1}. {role} {content[:100]}{'...' if len(content) > 100 else ''}")
+                sys.stdout.write("\n📜 Conversation History:\n" + "\n".join(lines) + "\n")
                 continue
-            
+
             # Send message
             print("🤖 Agent: ", end="", flush=True)
-            
+
             if streaming:
-                response = stream_message(thread_id, user_input)
+                async for delta in stream_message(session, thread_id, user_input):
+                    print(delta, end="", flush=True)
+                print()
             else:
-                response = send_message(thread_id, user_input)
-            
-            print(response)
-            
-        except KeyboardInterrupt:
+                response = await send_message(session, thread_id, user_input, use_cache=caching)
+                print(response)
+
+        except EOFError:
             print("\n\n👋 Goodbye!")
             break
         except Exception as e:
             print(f"\n❌ Error: {e}")
 
+def main():
+    try:
+        asyncio.run(chat())
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
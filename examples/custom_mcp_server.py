@@ -6,11 +6,15 @@ This example shows how to create a custom MCP server with tools
 and resources that can be integrated into the agent system.
 """
 
+import copy
 import json
 import logging
 import math
 import random
+import statistics
+from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 from mcp.server.fastmcp import FastMCP
@@ -40,29 +44,93 @@ ANALYTICS_DATA = {
     ]
 }
 
+# Index users by ID once, since the mock data is static
+USERS_BY_ID = {user["id"]: user for user in ANALYTICS_DATA["users"]}
 
-@mcp.tool()
-def get_user_stats() -> Dict[str, Any]:
-    """
-    Get basic user statistics.
-    
-    Returns:
-        Dictionary containing user statistics
-    """
+
+@lru_cache(maxsize=1)
+def _user_stats_core() -> Dict[str, Any]:
+    """Compute user statistics; cached because the mock data is static."""
     users = ANALYTICS_DATA["users"]
     
     ages = [user["age"] for user in users]
-    cities = [user["city"] for user in users]
+    users_by_city = dict(Counter(user["city"] for user in users))
     
     return {
         "total_users": len(users),
         "average_age": round(sum(ages) / len(ages), 1),
         "age_range": {"min": min(ages), "max": max(ages)},
-        "cities": list(set(cities)),
-        "users_by_city": {city: cities.count(city) for city in set(cities)},
+        "cities": list(users_by_city),
+        "users_by_city": users_by_city,
     }
 
 
+@lru_cache(maxsize=32)
+def _event_stats_core(event_type: Optional[str] = None) -> Dict[str, Any]:
+    """Compute event statistics; cached per event type filter."""
+    events = ANALYTICS_DATA["events"]
+    
+    if event_type:
+        filtered_events = [e for e in events if e["event"] == event_type]
+    else:
+        filtered_events = events
+    
+    event_counts = dict(Counter(e["event"] for e in filtered_events))
+    
+    # Calculate revenue for purchase events
+    purchase_events = [e for e in filtered_events if e["event"] == "purchase"]
+    total_revenue = sum(e.get("amount", 0) for e in purchase_events)
+    
+    return {
+        "total_events": len(filtered_events),
+        "event_types": event_counts,
+        "total_revenue": total_revenue,
+        "purchase_count": len(purchase_events),
+        "average_purchase": round(total_revenue / len(purchase_events), 2) if purchase_events else 0,
+    }
+
+
+@lru_cache(maxsize=1)
+def _summary_sections() -> Dict[str, Any]:
+    """Build the static part of the summary report."""
+    user_stats = _user_stats_core()
+    event_stats = _event_stats_core()
+    
+    return {
+        "user_summary": user_stats,
+        "event_summary": event_stats,
+        "key_metrics": {
+            "users_per_city": user_stats["users_by_city"],
+            "total_revenue": event_stats["total_revenue"],
+            "events_per_user": round(event_stats["total_events"] / user_stats["total_users"], 1),
+        }
+    }
+
+
+@lru_cache(maxsize=1)
+def _users_json() -> str:
+    """Serialize users once for the users resource."""
+    return json.dumps(ANALYTICS_DATA["users"], indent=2)
+
+
+@lru_cache(maxsize=1)
+def _events_json() -> str:
+    """Serialize events once for the events resource."""
+    return json.dumps(ANALYTICS_DATA["events"], indent=2)
+
+
+@mcp.tool()
+def get_user_stats() -> Dict[str, Any]:
+    """
+    Get basic user statistics.
+    
+    Returns:
+        Dictionary containing user statistics
+    """
+    # Cached results are shared, so callers get their own copy
+    return copy.deepcopy(_user_stats_core())
+
+
 @mcp.tool()
 def get_user_by_id(user_id: int) -> Dict[str, Any]:
     """
@@ -74,8 +142,7 @@ def get_user_by_id(user_id: int) -> Dict[str, Any]:
     Returns:
         User information or error message
     """
-    users = ANALYTICS_DATA["users"]
-    user = next((u for u in users if u["id"] == user_id), None)
+    user = USERS_BY_ID.get(user_id)
     
     if user:
         return user
@@ -117,27 +184,7 @@ def get_event_stats(event_type: Optional[str] = None) -> Dict[str, Any]:
     Returns:
         Event statistics
     """
-    events = ANALYTICS_DATA["events"]
-    
-    if event_type:
-        filtered_events = [e for e in events if e["event"] == event_type]
-    else:
-        filtered_events = events
-    
-    event_types = [e["event"] for e in filtered_events]
-    event_counts = {event: event_types.count(event) for event in set(event_types)}
-    
-    # Calculate revenue for purchase events
-    purchase_events = [e for e in filtered_events if e["event"] == "purchase"]
-    total_revenue = sum(e.get("amount", 0) for e in purchase_events)
-    
-    return {
-        "total_events": len(filtered_events),
-        "event_types": event_counts,
-        "total_revenue": total_revenue,
-        "purchase_count": len(purchase_events),
-        "average_purchase": round(total_revenue / len(purchase_events), 2) if purchase_events else 0,
-    }
+    return copy.deepcopy(_event_stats_core(event_type))
 
 
 @mcp.tool()
@@ -152,19 +199,10 @@ def generate_report(report_type: str = "summary") -> Dict[str, Any]:
         Generated report
     """
     if report_type == "summary":
-        user_stats = get_user_stats()
-        event_stats = get_event_stats()
-        
         return {
             "report_type": "summary",
             "generated_at": datetime.now().isoformat(),
-            "user_summary": user_stats,
-            "event_summary": event_stats,
-            "key_metrics": {
-                "users_per_city": user_stats["users_by_city"],
-                "total_revenue": event_stats["total_revenue"],
-                "events_per_user": round(event_stats["total_events"] / user_stats["total_users"], 1),
-            }
+            **copy.deepcopy(_summary_sections()),
         }
     
     elif report_type == "detailed":
@@ -210,13 +248,15 @@ def calculate_metrics(metric_type: str, values: List[float]) -> Dict[str, Any]:
         return {"error": "No values provided"}
     
     # Basic metrics
+    total = sum(values)
+    lowest, highest = min(values), max(values)
     basic_metrics = {
         "count": len(values),
-        "sum": sum(values),
-        "mean": sum(values) / len(values),
-        "min": min(values),
-        "max": max(values),
-        "range": max(values) - min(values),
+        "sum": total,
+        "mean": total / len(values),
+        "min": lowest,
+        "max": highest,
+        "range": highest - lowest,
     }
     
     if metric_type == "basic":
@@ -225,13 +265,9 @@ def calculate_metrics(metric_type: str, values: List[float]) -> Dict[str, Any]:
     elif metric_type == "advanced":
         # Calculate additional metrics
         mean = basic_metrics["mean"]
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
+        variance = statistics.pvariance(values, mu=mean)
         std_dev = math.sqrt(variance)
-        
-        # Median
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        median = (sorted_values[n//2] + sorted_values[(n-1)//2]) / 2
+        median = statistics.median(values)
         
         return {
             **basic_metrics,
@@ -248,50 +284,47 @@ def calculate_metrics(metric_type: str, values: List[float]) -> Dict[str, Any]:
 def _get_most_active_user() -> Dict[str, Any]:
     """Helper function to find the most active user."""
     events = ANALYTICS_DATA["events"]
-    user_event_counts = {}
-    
-    for event in events:
-        user_id = event["user_id"]
-        user_event_counts[user_id] = user_event_counts.get(user_id, 0) + 1
+    user_event_counts = Counter(event["user_id"] for event in events)
     
     if not user_event_counts:
         return {"error": "No events found"}
     
-    most_active_user_id = max(user_event_counts, key=user_event_counts.get)
-    user = next(u for u in ANALYTICS_DATA["users"] if u["id"] == most_active_user_id)
+    most_active_user_id, event_count = user_event_counts.most_common(1)[0]
+    user = USERS_BY_ID[most_active_user_id]
     
     return {
         "user": user,
-        "event_count": user_event_counts[most_active_user_id]
+        "event_count": event_count
     }
 
 
 def _get_popular_events() -> Dict[str, int]:
     """Helper function to get popular events."""
     events = ANALYTICS_DATA["events"]
-    event_types = [e["event"] for e in events]
-    return {event: event_types.count(event) for event in set(event_types)}
+    return dict(Counter(e["event"] for e in events))
 
 
 # Add resources for data access
 @mcp.resource("analytics://users")
 def get_users_resource() -> str:
     """Get all users as a resource."""
-    users = ANALYTICS_DATA["users"]
-    return json.dumps(users, indent=2)
+    return _users_json()
 
 
 @mcp.resource("analytics://events")
 def get_events_resource() -> str:
     """Get all events as a resource."""
-    events = ANALYTICS_DATA["events"]
-    return json.dumps(events, indent=2)
+    return _events_json()
 
 
 @mcp.resource("analytics://summary")
 def get_summary_resource() -> str:
     """Get analytics summary as a resource."""
-    summary = generate_report("summary")
+    summary = {
+        "report_type": "summary",
+        "generated_at": datetime.now().isoformat(),
+        **_summary_sections(),
+    }
     return json.dumps(summary, indent=2)
 
 
@@ -11,8 +11,12 @@ import asyncio
 import json
 import logging
 import os
-from typing import Any, Dict, List, Optional
-from datetime import datetime
+import secrets
+import threading
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from datetime import datetime, timezone
 
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
@@ -29,24 +33,154 @@ import mcp.server.stdio
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Try to import tavily-python, provide helpful error if not installed
-try:
+# tavily-python is imported on first use to keep server start-up fast
+if TYPE_CHECKING:
     from tavily import TavilyClient
+
+# Prefer orjson for serializing tool results, fall back to the stdlib encoder
+try:
+    import orjson
 except ImportError:
-    logger.error("tavily-python is not installed. Install it with: pip install tavily-python")
-    TavilyClient = None
+    orjson = None
+
+def _dumps(data: Any) -> str:
+    """Serialize a tool result to compact JSON."""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data)
+
+def _timestamp() -> str:
+    """Return the current UTC time as an ISO 8601 string."""
+    return datetime.now(timezone.utc).isoformat()
+
+# Shared Tavily client so its HTTP session is reused across tool calls
+_tavily_client: Optional["TavilyClient"] = None
+_tavily_client_lock = threading.Lock()
 
-# Initialize Tavily client
-def get_tavily_client() -> Optional[TavilyClient]:
-    """Initialize and return Tavily client with API key from environment."""
-    if TavilyClient is None:
+def get_tavily_client() -> Optional["TavilyClient"]:
+    """Return the shared Tavily client, creating it with the API key from environment."""
+    global _tavily_client
+    if _tavily_client is not None:
+        return _tavily_client
+    
+    # Try to import tavily-python, provide helpful error if not installed
+    try:
+        from tavily import TavilyClient
+    except ImportError:
+        logger.error("tavily-python is not installed. Install it with: pip install tavily-python")
         return None
         
     api_key = os.environ.get("TAVILY_API_KEY")
     if not api_key:
         logger.warning("TAVILY_API_KEY environment variable not set")
         return None
-    return TavilyClient(api_key=api_key)
+    
+    with _tavily_client_lock:
+        if _tavily_client is None:
+            _tavily_client = TavilyClient(api_key=api_key)
+    return _tavily_client
+
+# Cached results expire when the TTL bucket rolls over
+CACHE_TTL_SECONDS = 300
+
+# Maximum characters of raw page content kept per search result
+MAX_RAW_CONTENT_CHARS = 50_000
+
+# Searches fetch the maximum and are served page by page from memory, except raw
+# content searches, which fetch only the requested results and are not cached
+MAX_SEARCH_RESULTS = 20
+MAX_PAGE_TOKENS = 256
+_page_tokens: Dict[str, tuple] = {}
+
+def _store_page(state: tuple) -> str:
+    """Remember a paginated search and return a token for its next page."""
+    now = time.monotonic()
+    for token in [t for t, (expires_at, _) in _page_tokens.items() if expires_at <= now]:
+        del _page_tokens[token]
+    if len(_page_tokens) >= MAX_PAGE_TOKENS:
+        # Dicts keep insertion order, so the first token is the oldest
+        del _page_tokens[next(iter(_page_tokens))]
+    
+    token = secrets.token_urlsafe(8)
+    _page_tokens[token] = (now + CACHE_TTL_SECONDS, state)
+    return token
+
+def _load_page(token: str) -> Optional[tuple]:
+    """Return the state stored for a page token, or None if unknown or expired."""
+    entry = _page_tokens.get(token)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    return entry[1]
+
+def _ttl_bucket() -> int:
+    """Return the current cache time bucket."""
+    return int(time.time() // CACHE_TTL_SECONDS)
+
+class _CacheKey:
+    """Cache key that matches queries case-insensitively but keeps the caller's text for Tavily."""
+    
+    __slots__ = ("query", "params", "_normalized")
+    
+    def __init__(self, query: str, *params: Any) -> None:
+        self.query = query
+        self.params = params
+        self._normalized = (query.lower(), params)
+    
+    def __hash__(self) -> int:
+        return hash(self._normalized)
+    
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _CacheKey) and self._normalized == other._normalized
+
+@lru_cache(maxsize=1024)
+def _cached_search(key: _CacheKey, bucket: int) -> Dict[str, Any]:
+    """Run a Tavily search, cached per normalized parameters and TTL bucket."""
+    return _fetch_search(key.query, *key.params)
+
+def _fetch_search(
+    query: str,
+    max_results: int,
+    search_depth: str,
+    include_answer: bool,
+    include_raw_content: bool,
+    include_images: bool,
+) -> Dict[str, Any]:
+    """Run a Tavily search."""
+    response = get_tavily_client().search(
+        query=query,
+        max_results=max_results,
+        search_depth=search_depth,
+        include_answer=include_answer,
+        include_raw_content=include_raw_content,
+        include_images=include_images
+    )
+    
+    # Full page HTML can be megabytes per result, so keep only a bounded prefix
+    if include_raw_content:
+        for item in response.get("results", []):
+            raw_content = item.get("raw_content")
+            if raw_content and len(raw_content) > MAX_RAW_CONTENT_CHARS:
+                item["raw_content"] = raw_content[:MAX_RAW_CONTENT_CHARS]
+                item["raw_content_truncated"] = True
+    
+    return response
+
+@lru_cache(maxsize=1024)
+def _cached_quick_answer(key: _CacheKey, bucket: int) -> str:
+    """Run a Tavily Q&A search, cached per normalized question and TTL bucket."""
+    return get_tavily_client().qna_search(query=key.query)
+
+# Bound concurrent Tavily calls to stay under the API rate limit
+MAX_CONCURRENT_SEARCHES = 8
+_tavily_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+# Queries issued concurrently by the health check
+HEALTH_CHECK_PROBES = ("ping", "test")
+
+async def _run_bounded(func, *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking Tavily call in a worker thread without blocking the event loop."""
+    async with _tavily_semaphore:
+        return await asyncio.to_thread(func, *args, **kwargs)
 
 # Create the MCP server
 server = Server("tavily-search")
@@ -85,18 +219,52 @@ async def handle_list_tools() -> list[Tool]:
                     },
                     "include_raw_content": {
                         "type": "boolean", 
-                        "description": "Include raw HTML content of search results",
+                        "description": "Include raw HTML content of search results (truncated to 50,000 characters per result)",
                         "default": False
                     },
                     "include_images": {
                         "type": "boolean",
                         "description": "Include related images in search results",
                         "default": False
+                    },
+                    "page_token": {
+                        "type": "string",
+                        "description": "next_page_token from a previous tavily_search response; returns the next page of that search and ignores the other search options"
                     }
                 },
                 "required": ["query"]
             }
         ),
+        Tool(
+            name="tavily_search_batch",
+            description="Run several Tavily web searches concurrently. Use this instead of repeated tavily_search calls when more than one query is needed.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "description": "The search query strings",
+                        "items": {"type": "string"},
+                        "minItems": 1,
+                        "maxItems": 10
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "Maximum number of search results per query (default: 5, max: 20)",
+                        "minimum": 1,
+                        "maximum": 20,
+                        "default": 5
+                    },
+                    "search_depth": {
+                        "type": "string",
+                        "description": "Search depth: 'basic' for quick results, 'advanced' for comprehensive search",
+                        "enum": ["basic", "advanced"],
+                        "default": "basic"
+                    }
+                },
+                "required": ["queries"]
+            }
+        ),
         Tool(
             name="tavily_quick_answer",
             description="Get a quick answer to a question using Tavily's search and answer API. Best for direct questions that need immediate answers.",
@@ -128,6 +296,8 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent]:
     
     if name == "tavily_search":
         return await handle_tavily_search(arguments)
+    elif name == "tavily_search_batch":
+        return await handle_tavily_search_batch(arguments)
     elif name == "tavily_quick_answer":
         return await handle_tavily_quick_answer(arguments)
     elif name == "tavily_health_check":
@@ -137,25 +307,47 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent]:
 
 async def handle_tavily_search(arguments: dict) -> list[TextContent]:
     """Handle tavily search requests."""
+    now = _timestamp()
     try:
         client = get_tavily_client()
         if not client:
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=_dumps({
                     "error": "Tavily client not available. Check API key and tavily-python installation.",
                     "status": "error"
                 })
             )]
         
+        result = await _search(arguments, now)
+        return [TextContent(type="text", text=_dumps(result))]
+        
+    except Exception as e:
+        logger.error(f"Error in tavily_search: {e}")
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                "error": f"Search failed: {str(e)}",
+                "query": arguments.get("query", ""),
+                "timestamp": now
+            })
+        )]
+
+async def _search(arguments: dict, now: str) -> Dict[str, Any]:
+    """Run a single Tavily search, or continue a paginated one, and format its result."""
+    max_results = min(max(arguments.get("max_results", 5), 1), MAX_SEARCH_RESULTS)
+    page_token = arguments.get("page_token")
+    
+    if page_token:
+        state = _load_page(page_token)
+        if state is None:
+            return {"error": "Page token is invalid or has expired"}
+        query, search_depth, offset, response = state
+    else:
         query = arguments.get("query", "")
         if not query or not query.strip():
-            return [TextContent(
-                type="text", 
-                text=json.dumps({"error": "Query cannot be empty"})
-            )]
+            return {"error": "Query cannot be empty"}
         
-        max_results = min(max(arguments.get("max_results", 5), 1), 20)
         search_depth = arguments.get("search_depth", "basic")
         include_answer = arguments.get("include_answer", True)
         include_raw_content = arguments.get("include_raw_content", False)
@@ -164,56 +356,103 @@ async def handle_tavily_search(arguments: dict) -> list[TextContent]:
         if search_depth not in ["basic", "advanced"]:
             search_depth = "basic"
         
-        # Make the search request
-        response = client.search(
-            query=query.strip(),
-            max_results=max_results,
-            search_depth=search_depth,
-            include_answer=include_answer,
-            include_raw_content=include_raw_content,
-            include_images=include_images
+        # Make the search request (repeated searches are served from cache). Raw content
+        # is up to MAX_RAW_CONTENT_CHARS per result, so those responses fetch only the
+        # requested results and are not kept in the cache
+        key = _CacheKey(
+            query.strip(),
+            max_results if include_raw_content else MAX_SEARCH_RESULTS,
+            search_depth,
+            include_answer,
+            include_raw_content,
+            include_images,
         )
+        if include_raw_content:
+            response = await _run_bounded(_fetch_search, key.query, *key.params)
+        else:
+            response = await _run_bounded(_cached_search, key, _ttl_bucket())
+        offset = 0
+    
+    all_results = response.get("results", [])
+    results = all_results[offset:offset + max_results]
+    next_offset = offset + max_results
+    
+    # Answer, images and follow-ups describe the whole search, so only the first page carries them
+    first_page = offset == 0
+    
+    # Format result in a single literal so every response has the same key order
+    return {
+        "query": query,
+        "search_depth": search_depth,
+        "max_results": max_results,
+        "timestamp": now,
+        "results_count": len(results),
+        "results": results,
+        **({"answer": response["answer"]}
+           if first_page and include_answer and response.get("answer") else {}),
+        **({"images": response["images"]}
+           if first_page and include_images and response.get("images") else {}),
+        **({"follow_up_questions": follow_up_questions}
+           if first_page and (follow_up_questions := response.get("follow_up_questions")) else {}),
+        **({"next_page_token": _store_page((query, search_depth, next_offset, response))}
+           if next_offset < len(all_results) else {}),
+    }
+
+async def handle_tavily_search_batch(arguments: dict) -> list[TextContent]:
+    """Handle batched tavily search requests."""
+    now = _timestamp()
+    try:
+        client = get_tavily_client()
+        if not client:
+            return [TextContent(
+                type="text",
+                text=_dumps({
+                    "error": "Tavily client not available. Check API key and tavily-python installation.",
+                    "status": "error"
+                })
+            )]
         
-        # Format result
-        result = {
-            "query": query,
-            "search_depth": search_depth,
-            "max_results": max_results,
-            "timestamp": datetime.utcnow().isoformat(),
-            "results_count": len(response.get("results", [])),
-            "results": response.get("results", []),
-        }
-        
-        if include_answer and response.get("answer"):
-            result["answer"] = response["answer"]
+        queries = arguments.get("queries") or []
+        if not queries:
+            return [TextContent(
+                type="text",
+                text=_dumps({"error": "Queries cannot be empty"})
+            )]
         
-        if include_images and response.get("images"):
-            result["images"] = response["images"]
+        shared = {k: arguments[k] for k in ("max_results", "search_depth") if k in arguments}
+        outcomes = await asyncio.gather(
+            *(_search({**shared, "query": query}, now) for query in queries),
+            return_exceptions=True,
+        )
         
-        if response.get("follow_up_questions"):
-            result["follow_up_questions"] = response["follow_up_questions"]
+        results = []
+        for query, outcome in zip(queries, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error in tavily_search_batch for '{query}': {outcome}")
+                outcome = {"error": f"Search failed: {str(outcome)}", "query": query}
+            results.append(outcome)
         
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        return [TextContent(type="text", text=_dumps({"results": results}))]
         
     except Exception as e:
-        logger.error(f"Error in tavily_search: {e}")
+        logger.error(f"Error in tavily_search_batch: {e}")
         return [TextContent(
             type="text",
-            text=json.dumps({
-                "error": f"Search failed: {str(e)}",
-                "query": arguments.get("query", ""),
-                "timestamp": datetime.utcnow().isoformat()
+            text=_dumps({
+                "error": f"Batch search failed: {str(e)}",
+                "timestamp": now
             })
         )]
 
 async def handle_tavily_quick_answer(arguments: dict) -> list[TextContent]:
     """Handle quick answer requests."""
+    now = _timestamp()
     try:
         client = get_tavily_client()
         if not client:
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=_dumps({
                     "error": "Tavily client not available. Check API key and tavily-python installation.",
                     "status": "error"
                 })
@@ -223,72 +462,96 @@ async def handle_tavily_quick_answer(arguments: dict) -> list[TextContent]:
         if not question or not question.strip():
             return [TextContent(
                 type="text",
-                text=json.dumps({"error": "Question cannot be empty"})
+                text=_dumps({"error": "Question cannot be empty"})
             )]
         
-        # Use qna_search for direct answers
-        response = client.qna_search(query=question.strip())
+        # Use qna_search for direct answers (repeated questions are served from cache)
+        response = await _run_bounded(_cached_quick_answer, _CacheKey(question.strip()), _ttl_bucket())
         
         result = {
             "question": question,
             "answer": response,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": now
         }
         
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        return [TextContent(type="text", text=_dumps(result))]
         
     except Exception as e:
         logger.error(f"Error in tavily_quick_answer: {e}")
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=_dumps({
                 "error": f"Quick answer failed: {str(e)}",
                 "question": arguments.get("question", ""),
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now
             })
         )]
 
 async def handle_tavily_health_check(arguments: dict) -> list[TextContent]:
     """Handle health check requests."""
+    now = _timestamp()
     try:
         client = get_tavily_client()
         if not client:
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=_dumps({
                     "status": "error",
                     "api_accessible": False,
                     "error": "Tavily client not available. Check API key and tavily-python installation.",
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": now
                 })
             )]
         
-        # Perform a simple test search
-        response = client.search(
-            query="test",
-            max_results=1,
-            search_depth="basic",
-            include_answer=False
+        async def _probe(kind: str) -> Dict[str, Any]:
+            start = time.perf_counter_ns()
+            response = await _run_bounded(
+                client.search,
+                query=kind,
+                max_results=1,
+                search_depth="basic",
+                include_answer=False
+            )
+            return {
+                "latency_ms": round((time.perf_counter_ns() - start) / 1_000_000, 1),
+                "results_count": len(response.get("results", [])),
+            }
+        
+        # Run the probes concurrently so the check takes as long as the slowest one
+        outcomes = await asyncio.gather(
+            *(_probe(kind) for kind in HEALTH_CHECK_PROBES), return_exceptions=True
         )
         
+        probes = {}
+        for kind, outcome in zip(HEALTH_CHECK_PROBES, outcomes):
+            if isinstance(outcome, Exception):
+                probes[kind] = {"status": "error", "error": str(outcome)}
+            else:
+                probes[kind] = {"status": "ok", **outcome}
+        
+        succeeded = [probe for probe in probes.values() if probe["status"] == "ok"]
+        if not succeeded:
+            raise RuntimeError(probes[HEALTH_CHECK_PROBES[0]]["error"])
+        
         result = {
-            "status": "healthy",
+            "status": "healthy" if len(succeeded) == len(probes) else "degraded",
             "api_accessible": True,
-            "timestamp": datetime.utcnow().isoformat(),
-            "test_results_count": len(response.get("results", []))
+            "timestamp": now,
+            "test_results_count": succeeded[0]["results_count"],
+            "probes": probes
         }
         
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        return [TextContent(type="text", text=_dumps(result))]
         
     except Exception as e:
         logger.error(f"Error in health check: {e}")
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=_dumps({
                 "status": "error",
                 "api_accessible": False,
                 "error": f"API error: {str(e)}",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now
             })
         )]
 
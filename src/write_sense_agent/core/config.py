@@ -1,11 +1,22 @@
 """Configuration module for WriteSense Agent system."""
 
 import os
+from dataclasses import dataclass
 from enum import Enum
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Dict, Final, List, Mapping, Optional, Union
 
-from pydantic import BaseModel, Field, validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    model_validator,
+)
+
+# pathlib is only needed by from_file, which from_env-based start-up never calls
+if TYPE_CHECKING:
+    from pathlib import Path
 
 
 class TransportType(str, Enum):
@@ -23,16 +34,91 @@ class ModelProvider(str, Enum):
     OPENAI = "openai"
 
 
+# Transports that spawn a command, and those that connect to a server URL instead
+_STDIO_TRANSPORTS: Final[frozenset[TransportType]] = frozenset({TransportType.STDIO})
+_URL_TRANSPORTS: Final[frozenset[TransportType]] = frozenset({TransportType.SSE, TransportType.STREAMABLE_HTTP})
+
+
+# Environment variable holding each provider's API key
+_PROVIDER_API_KEY_ENV: Mapping[ModelProvider, str] = MappingProxyType({
+    ModelProvider.OPENAI: "OPENAI_API_KEY",
+    ModelProvider.ANTHROPIC: "ANTHROPIC_API_KEY",
+})
+
+
+# Values accepted as true for boolean environment variables
+_BOOL_TRUE = frozenset({"1", "true", "yes", "on"})
+
+
+def _getbool(name: str, default: bool) -> bool:
+    """Read a boolean environment variable."""
+    value = os.environ.get(name)
+    return default if value is None else value.lower() in _BOOL_TRUE
+
+
+def _getint(name: str, default: int) -> int:
+    """Read an integer environment variable."""
+    value = os.environ.get(name)
+    return default if value is None else int(value)
+
+
+def _getfloat(name: str, default: float) -> float:
+    """Read a float environment variable."""
+    value = os.environ.get(name)
+    return default if value is None else float(value)
+
+
+@dataclass(frozen=True)
+class _EnvSettings:
+    """Settings read from the environment by AgentConfig.from_env."""
+    
+    orchestrator_provider: ModelProvider
+    orchestrator_model: str
+    orchestrator_temperature: float
+    orchestrator_max_tokens: int
+    mcp_agents_provider: ModelProvider
+    mcp_agents_model: str
+    mcp_agents_temperature: float
+    mcp_agents_max_tokens: int
+    debug: bool
+    log_level: str
+
+
+@lru_cache(maxsize=1)
+def _env_snapshot() -> _EnvSettings:
+    """
+    Read and convert the from_env settings once per process.
+    
+    Call ``_env_snapshot.cache_clear()`` after changing these variables at runtime.
+    """
+    return _EnvSettings(
+        # Orchestrator LLM configuration (more powerful model)
+        orchestrator_provider=ModelProvider(os.getenv("ORCHESTRATOR_LLM_PROVIDER", "openai")),
+        orchestrator_model=os.getenv("ORCHESTRATOR_LLM_MODEL", "gpt-4o"),
+        orchestrator_temperature=_getfloat("ORCHESTRATOR_LLM_TEMPERATURE", 0.0),
+        orchestrator_max_tokens=_getint("ORCHESTRATOR_LLM_MAX_TOKENS", 4000),
+        # MCP agents LLM configuration (can be faster/cheaper model)
+        mcp_agents_provider=ModelProvider(os.getenv("MCP_AGENTS_LLM_PROVIDER", "openai")),
+        mcp_agents_model=os.getenv("MCP_AGENTS_LLM_MODEL", "gpt-4o-mini"),
+        mcp_agents_temperature=_getfloat("MCP_AGENTS_LLM_TEMPERATURE", 0.0),
+        mcp_agents_max_tokens=_getint("MCP_AGENTS_LLM_MAX_TOKENS", 2000),
+        debug=_getbool("DEBUG", False),
+        log_level=os.getenv("LOG_LEVEL", "INFO"),
+    )
+
+
 class MCPServerConfig(BaseModel):
     """Configuration for a single MCP server."""
     
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     name: str = Field(..., description="Unique name for the MCP server")
     transport: TransportType = Field(..., description="Transport protocol to use")
     
     # For stdio transport
     command: Optional[str] = Field(None, description="Command to execute for stdio transport")
-    args: Optional[List[str]] = Field(default_factory=list, description="Arguments for the command")
-    env: Optional[Dict[str, str]] = Field(default_factory=dict, description="Environment variables")
+    args: Optional[List[str]] = Field(None, description="Arguments for the command (None means no arguments)")
+    env: Optional[Dict[str, str]] = Field(None, description="Environment variables (None means no extra variables)")
     
     # For SSE/HTTP transport
     url: Optional[str] = Field(None, description="URL for SSE/HTTP transport")
@@ -41,26 +127,22 @@ class MCPServerConfig(BaseModel):
     timeout: int = Field(30, description="Connection timeout in seconds")
     max_retries: int = Field(3, description="Maximum number of connection retries")
     
-    @validator("command", always=True)
-    def validate_stdio_config(cls, v: Optional[str], values: Dict[str, Any]) -> Optional[str]:
-        """Validate that stdio transport has required command."""
-        transport = values.get("transport")
-        if transport == TransportType.STDIO and not v:
+    @model_validator(mode="after")
+    def validate_transport_config(self) -> "MCPServerConfig":
+        """Validate that the transport has its required command or URL."""
+        transport = self.transport
+        if transport in _STDIO_TRANSPORTS and not self.command:
             raise ValueError("command is required for stdio transport")
-        return v
-    
-    @validator("url", always=True)
-    def validate_url_config(cls, v: Optional[str], values: Dict[str, Any]) -> Optional[str]:
-        """Validate that SSE/HTTP transport has required URL."""
-        transport = values.get("transport")
-        if transport in (TransportType.SSE, TransportType.STREAMABLE_HTTP) and not v:
+        if transport in _URL_TRANSPORTS and not self.url:
             raise ValueError("url is required for SSE/HTTP transport")
-        return v
+        return self
 
 
 class LLMConfig(BaseModel):
     """Configuration for language model."""
     
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     provider: ModelProvider = Field(..., description="LLM provider")
     model: str = Field(..., description="Model name")
     temperature: float = Field(0.0, ge=0.0, le=2.0, description="Model temperature")
@@ -71,78 +153,101 @@ class LLMConfig(BaseModel):
     api_key: Optional[str] = Field(None, description="API key for the provider")
     base_url: Optional[str] = Field(None, description="Custom base URL")
     
-    @validator("api_key", always=True)
-    def validate_api_key(cls, v: Optional[str], values: Dict[str, Any]) -> Optional[str]:
-        """Validate API key configuration."""
-        if not v:
-            provider = values.get("provider")
-            env_var = f"{provider.upper()}_API_KEY" if provider else "API_KEY"
+    @model_validator(mode="before")
+    @classmethod
+    def validate_api_key(cls, data: Any) -> Any:
+        """Fill a missing API key from the provider's environment variable."""
+        if isinstance(data, dict) and not data.get("api_key"):
+            # ModelProvider is a str enum, so raw provider strings hit the same keys
+            env_var = _PROVIDER_API_KEY_ENV.get(data.get("provider"), "API_KEY")
             api_key = os.getenv(env_var)
             if not api_key:
                 raise ValueError(f"API key not found in environment variable {env_var}")
-            return api_key
-        return v
+            return {**data, "api_key": api_key}
+        return data
+
+
+@lru_cache(maxsize=32)
+def _default_llm(provider: ModelProvider, model: str, temperature: float, max_tokens: int) -> LLMConfig:
+    """Build an LLMConfig for from_env; LLMConfig is frozen, so identical configs share one instance."""
+    return LLMConfig(provider=provider, model=model, temperature=temperature, max_tokens=max_tokens)
+
+
+# Base orchestrator prompt; adjacent literals are joined at compile time into one shared constant
+_ORCHESTRATOR_SYSTEM_PROMPT: Final[str] = (
+    "You are the WriteSense Agent, an intelligent assistant specifically designed to help people with "
+    "disabilities create and work with documents. Your primary purpose is to assist users in writing reports, "
+    "diaries, and other types of documents through natural interaction with humans.\n\n"
+    "IMPORTANT: YOU MUST ALWAYS RESPOND TO USERS IN VIETNAMESE regardless of what language they use to communicate with you.\n\n"
+    "CRITICAL RESPONSE FORMAT REQUIREMENT:\n"
+    "YOU MUST ALWAYS reply the final result using EXACTLY this format - no exceptions:\n\n"
+    "Action: <action type>\n"
+    "Action content: <action content>\n"
+    "Answer: <answer>\n\n"
+    "Available action types:\n"
+    "DOCUMENT MANAGEMENT:\n"
+    "- create_doc: Create a completely new document from scratch\n"
+    "- set_title_doc: Set or change the title/name of the entire document\n"
+    "- read_title_doc: Read the current title/name of the document\n"
+    "- save_doc: Save the current document to storage\n"
+    "- remove_doc: Delete/remove the entire document permanently\n\n"
+    "PAGE CREATION & NAVIGATION:\n"
+    "- add_page: CREATE A NEW PAGE and automatically switch to it (use when user wants to add/create a new page)\n"
+    "- next_page: NAVIGATE to the next existing page (use only for moving between existing pages)\n"
+    "- prev_page: NAVIGATE to the previous existing page (use only for moving between existing pages)\n"
+    "- delete_page: Delete/remove a specific page from the document\n\n"
+    "PAGE CONTENT OPERATIONS:\n"
+    "- add_to_page: ADD/APPEND new content to the current page (keeps existing content)\n"
+    "- rewrite_page: COMPLETELY REPLACE all content on the current page (removes existing content)\n"
+    "- read_page: Read the content of the current page\n"
+    "- set_title_page: Set or change the title/header of the current page only\n"
+    "- read_title_page: Read the title/header of the current page\n\n"
+    "COMMUNICATION:\n"
+    "- reply_user: Just reply to user with conversational content, without making any document changes\n\n"
+
+    "SUB-AGENT DELEGATION GUIDELINES:\n"
+    "You have access to specialized sub-agents with specific capabilities. However, you should be selective about when to use them:\n\n"
+    "DELEGATE TO SUB-AGENTS ONLY WHEN:\n"
+    "- The user specifically requests a complex task that requires specialized knowledge\n"
+    "- You need additional information or capabilities that you don't have\n"
+    "- The task clearly benefits from a specific sub-agent's expertise\n\n"
+    "DO NOT DELEGATE TO SUB-AGENTS WHEN:\n"
+    "- You can handle simple conversations, greetings, or basic questions directly\n"
+    "- The user is just asking general questions about your capabilities\n"
+    "- Simple document operations can be done without specialized tools\n"
+    "- The request is straightforward and doesn't require external data or complex processing\n\n"
+    "DISABILITY SUPPORT GUIDELINES:\n"
+    "- Use simple and clear language that is easy to understand\n"
+    "- Provide detailed step-by-step instructions when needed\n"
+    "- Be patient and supportive throughout the document creation process\n"
+    "- Suggest alternative approaches to complete tasks when appropriate\n"
+    "- Always confirm understanding before proceeding to the next step\n"
+    "- Break down complex tasks into smaller, manageable parts\n"
+    "- Offer encouragement and positive reinforcement\n"
+    "- Be flexible and adapt to different user needs and abilities\n\n"
+    "Remember: Handle simple requests directly and only use sub-agents when their specialized capabilities are truly needed. "
+    "Always follow the exact Action/Content format in Vietnamese."
+)
 
 
 class OrchestratorConfig(BaseModel):
     """Configuration for the orchestrator agent."""
     
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     system_prompt: str = Field(
-        "You are the WriteSense Agent, an intelligent assistant specifically designed to help people with "
-        "disabilities create and work with documents. Your primary purpose is to assist users in writing reports, "
-        "diaries, and other types of documents through natural interaction with humans.\n\n"
-        "IMPORTANT: YOU MUST ALWAYS RESPOND TO USERS IN VIETNAMESE regardless of what language they use to communicate with you.\n\n"
-        "CRITICAL RESPONSE FORMAT REQUIREMENT:\n"
-        "YOU MUST ALWAYS reply the final result using EXACTLY this format - no exceptions:\n\n"
-        "Action: <action type>\n"
-        "Action content: <action content>\n"
-        "Answer: <answer>\n\n"
-        "Available action types:\n"
-        "DOCUMENT MANAGEMENT:\n"
-        "- create_doc: Create a completely new document from scratch\n"
-        "- set_title_doc: Set or change the title/name of the entire document\n"
-        "- read_title_doc: Read the current title/name of the document\n"
-        "- save_doc: Save the current document to storage\n"
-        "- remove_doc: Delete/remove the entire document permanently\n\n"
-        "PAGE CREATION & NAVIGATION:\n"
-        "- add_page: CREATE A NEW PAGE and automatically switch to it (use when user wants to add/create a new page)\n"
-        "- next_page: NAVIGATE to the next existing page (use only for moving between existing pages)\n"
-        "- prev_page: NAVIGATE to the previous existing page (use only for moving between existing pages)\n"
-        "- delete_page: Delete/remove a specific page from the document\n\n"
-        "PAGE CONTENT OPERATIONS:\n"
-        "- add_to_page: ADD/APPEND new content to the current page (keeps existing content)\n"
-        "- rewrite_page: COMPLETELY REPLACE all content on the current page (removes existing content)\n"
-        "- read_page: Read the content of the current page\n"
-        "- set_title_page: Set or change the title/header of the current page only\n"
-        "- read_title_page: Read the title/header of the current page\n\n"
-        "COMMUNICATION:\n"
-        "- reply_user: Just reply to user with conversational content, without making any document changes\n\n"
-
-        "SUB-AGENT DELEGATION GUIDELINES:\n"
-        "You have access to specialized sub-agents with specific capabilities. However, you should be selective about when to use them:\n\n"
-        "DELEGATE TO SUB-AGENTS ONLY WHEN:\n"
-        "- The user specifically requests a complex task that requires specialized knowledge\n"
-        "- You need additional information or capabilities that you don't have\n"
-        "- The task clearly benefits from a specific sub-agent's expertise\n\n"
-        "DO NOT DELEGATE TO SUB-AGENTS WHEN:\n"
-        "- You can handle simple conversations, greetings, or basic questions directly\n"
-        "- The user is just asking general questions about your capabilities\n"
-        "- Simple document operations can be done without specialized tools\n"
-        "- The request is straightforward and doesn't require external data or complex processing\n\n"
-        "DISABILITY SUPPORT GUIDELINES:\n"
-        "- Use simple and clear language that is easy to understand\n"
-        "- Provide detailed step-by-step instructions when needed\n"
-        "- Be patient and supportive throughout the document creation process\n"
-        "- Suggest alternative approaches to complete tasks when appropriate\n"
-        "- Always confirm understanding before proceeding to the next step\n"
-        "- Break down complex tasks into smaller, manageable parts\n"
-        "- Offer encouragement and positive reinforcement\n"
-        "- Be flexible and adapt to different user needs and abilities\n\n"
-        "Remember: Handle simple requests directly and only use sub-agents when their specialized capabilities are truly needed. "
-        "Always follow the exact Action/Content format in Vietnamese.",
+        _ORCHESTRATOR_SYSTEM_PROMPT,
         description="Base system prompt for the orchestrator (delegation guidelines are added dynamically)"
     )
     max_iterations: int = Field(10, ge=1, le=50, description="Maximum orchestration iterations")
+    delegation_timeout: float = Field(120.0, gt=0, description="Timeout in seconds for each query delegated to an MCP agent")
+    inline_single_agent: bool = Field(
+        False,
+        description=(
+            "With a single MCP agent, give its tools to the orchestrator instead of delegating to it; "
+            "the system prompt should then describe tools rather than sub-agents"
+        )
+    )
     enable_memory: bool = Field(True, description="Enable conversation memory")
     memory_max_tokens: int = Field(4000, description="Maximum tokens for memory")
 
@@ -150,6 +255,8 @@ class OrchestratorConfig(BaseModel):
 class AgentConfig(BaseModel):
     """Main configuration for the WriteSense Agent system."""
     
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     # LLM configurations - separate models for different agent types
     orchestrator_llm: LLMConfig = Field(..., description="Language model configuration for orchestrator agent")
     mcp_agents_llm: LLMConfig = Field(..., description="Language model configuration for MCP agents")
@@ -174,56 +281,89 @@ class AgentConfig(BaseModel):
     @classmethod
     def from_env(cls) -> "AgentConfig":
         """Create configuration from environment variables."""
-        # Orchestrator LLM configuration (more powerful model)
-        orchestrator_provider = ModelProvider(os.getenv("ORCHESTRATOR_LLM_PROVIDER", "openai"))
-        orchestrator_model = os.getenv("ORCHESTRATOR_LLM_MODEL", "gpt-4o")
+        env = _env_snapshot()
         
-        orchestrator_llm_config = LLMConfig(
-            provider=orchestrator_provider,
-            model=orchestrator_model,
-            temperature=float(os.getenv("ORCHESTRATOR_LLM_TEMPERATURE", "0.0")),
-            max_tokens=int(os.getenv("ORCHESTRATOR_LLM_MAX_TOKENS", "4000")),
+        orchestrator_llm_config = _default_llm(
+            env.orchestrator_provider,
+            env.orchestrator_model,
+            env.orchestrator_temperature,
+            env.orchestrator_max_tokens,
         )
         
-        # MCP agents LLM configuration (can be faster/cheaper model)
-        mcp_provider = ModelProvider(os.getenv("MCP_AGENTS_LLM_PROVIDER", "openai"))
-        mcp_model = os.getenv("MCP_AGENTS_LLM_MODEL", "gpt-4o-mini")
-        
-        mcp_agents_llm_config = LLMConfig(
-            provider=mcp_provider,
-            model=mcp_model,
-            temperature=float(os.getenv("MCP_AGENTS_LLM_TEMPERATURE", "0.0")),
-            max_tokens=int(os.getenv("MCP_AGENTS_LLM_MAX_TOKENS", "2000")),
+        mcp_agents_llm_config = _default_llm(
+            env.mcp_agents_provider,
+            env.mcp_agents_model,
+            env.mcp_agents_temperature,
+            env.mcp_agents_max_tokens,
         )
         
         # Basic configuration
         config = cls(
             orchestrator_llm=orchestrator_llm_config,
             mcp_agents_llm=mcp_agents_llm_config,
-            debug=os.getenv("DEBUG", "false").lower() == "true",
-            log_level=os.getenv("LOG_LEVEL", "INFO"),
+            debug=env.debug,
+            log_level=env.log_level,
         )
         
         return config
     
     @classmethod
-    def from_file(cls, config_path: Union[str, Path]) -> "AgentConfig":
-        """Load configuration from a JSON/YAML file."""
-        import json
+    def from_file(cls, config_path: Union[str, "Path"], trusted: bool = False) -> "AgentConfig":
+        """
+        Load configuration from a JSON/YAML file.
+        
+        Args:
+            config_path: Path to the configuration file
+            trusted: Skip validation for files produced by a trusted build step.
+                This uses ``model_construct``, so values are neither coerced nor
+                checked and API keys are not read from the environment; files
+                written by hand should use the default validating path.
+        """
+        from pathlib import Path
+        
+        # Prefer orjson when installed; both parsers accept bytes
+        try:
+            from orjson import loads
+        except ImportError:
+            from json import loads
         
         config_path = Path(config_path)
         if not config_path.exists():
             raise FileNotFoundError(f"Configuration file not found: {config_path}")
         
-        with config_path.open("r") as f:
-            if config_path.suffix.lower() == ".json":
-                data = json.load(f)
-            else:
-                # For YAML support, you'd need to install PyYAML
-                raise ValueError("Only JSON configuration files are currently supported")
+        if config_path.suffix.lower() == ".json":
+            data = loads(config_path.read_bytes())
+        else:
+            # For YAML support, you'd need to install PyYAML
+            raise ValueError("Only JSON configuration files are currently supported")
         
+        if trusted:
+            return cls._construct_trusted(data)
         return cls(**data)
     
+    @classmethod
+    def _construct_trusted(cls, data: Dict[str, Any]) -> "AgentConfig":
+        """Build the configuration tree from trusted data without validation."""
+        def construct_llm(llm_data: Dict[str, Any]) -> LLMConfig:
+            # Enums are still converted since agents read provider.value
+            return LLMConfig.model_construct(**{**llm_data, "provider": ModelProvider(llm_data["provider"])})
+        
+        fields = {
+            **data,
+            "orchestrator_llm": construct_llm(data["orchestrator_llm"]),
+            "mcp_agents_llm": construct_llm(data["mcp_agents_llm"]),
+            "mcp_servers": {
+                name: MCPServerConfig.model_construct(
+                    **{**server, "transport": TransportType(server["transport"])}
+                )
+                for name, server in data.get("mcp_servers", {}).items()
+            },
+        }
+        if "orchestrator" in data:
+            fields["orchestrator"] = OrchestratorConfig.model_construct(**data["orchestrator"])
+        
+        return cls.model_construct(**fields)
+    
     def add_mcp_server(
         self,
         name: str,
@@ -238,15 +378,15 @@ class AgentConfig(BaseModel):
             name=name,
             transport=transport,
             command=command,
-            args=args or [],
+            args=args,
             url=url,
             **kwargs,
         )
         self.mcp_servers[name] = server_config
     
     def get_langgraph_config(self) -> Dict[str, Any]:
-        """Get configuration dict for LangGraph."""
+        """Get configuration dict for LangGraph (a new dict on every call, so callers may extend it)."""
         return {
             "recursion_limit": self.recursion_limit,
             "debug": self.debug,
-        } 
\ No newline at end of file
+        }
@@ -0,0 +1,99 @@
+"""Shared language model clients for WriteSense agents."""
+
+import hashlib
+import importlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+from write_sense_agent.core.config import LLMConfig, ModelProvider
+
+if TYPE_CHECKING:
+    import httpx
+
+
+# Chat model clients keyed by their settings, so agents with the same LLM
+# configuration share one client and its HTTP connection pool
+_LLM_CACHE: Dict[Tuple[Any, ...], Any] = {}
+
+
+def get_llm(llm_config: LLMConfig) -> Any:
+    """
+    Get the language model for a configuration, reusing an existing client when possible.
+    
+    Args:
+        llm_config: Language model configuration
+    
+    Returns:
+        Chat model client for the configured provider
+    """
+    # Key on a digest so the plaintext API key is never part of the cache key
+    api_key_hash = (
+        hashlib.sha256(llm_config.api_key.encode()).hexdigest() if llm_config.api_key else None
+    )
+    key = (
+        llm_config.provider,
+        llm_config.model,
+        llm_config.temperature,
+        llm_config.max_tokens,
+        llm_config.timeout,
+        api_key_hash,
+        llm_config.base_url,
+    )
+    
+    llm = _LLM_CACHE.get(key)
+    if llm is None:
+        llm = _LLM_CACHE[key] = _build_llm(llm_config)
+    return llm
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> "httpx.AsyncClient":
+    """Get the async HTTP client shared by LLM clients so they reuse keep-alive connections."""
+    import httpx
+    
+    # Request timeouts are set per call by the provider SDKs
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=200, keepalive_expiry=30.0),
+    )
+
+
+@lru_cache(maxsize=None)
+def _chat_model_class(provider: ModelProvider) -> Any:
+    """Import the chat model class for a provider once, with an install hint if it's missing."""
+    if provider == ModelProvider.ANTHROPIC:
+        module_name, class_name, package = "langchain_anthropic", "ChatAnthropic", "langchain-anthropic"
+    elif provider == ModelProvider.OPENAI:
+        module_name, class_name, package = "langchain_openai", "ChatOpenAI", "langchain-openai"
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as e:
+        raise ImportError(
+            f"{package} is required for the {provider.value} provider. Install it with: pip install {package}"
+        ) from e
+    return getattr(module, class_name)
+
+
+def _build_llm(llm_config: LLMConfig) -> Any:
+    """Create the language model based on configuration."""
+    chat_model = _chat_model_class(llm_config.provider)
+    
+    if llm_config.provider == ModelProvider.ANTHROPIC:
+        return chat_model(
+            model=llm_config.model,
+            temperature=llm_config.temperature,
+            max_tokens=llm_config.max_tokens,
+            timeout=llm_config.timeout,
+            api_key=llm_config.api_key,
+        )
+    return chat_model(
+        model=llm_config.model,
+        temperature=llm_config.temperature,
+        max_tokens=llm_config.max_tokens,
+        timeout=llm_config.timeout,
+        api_key=llm_config.api_key,
+        base_url=llm_config.base_url,
+        http_async_client=get_http_client(),
+    )
@@ -2,19 +2,28 @@
 
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional, Sequence
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 from langchain_core.messages import BaseMessage
 from langchain_core.tools import BaseTool
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_mcp_adapters.tools import load_mcp_tools
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
 from mcp.client.streamable_http import streamablehttp_client
 
-from write_sense_agent.core.config import AgentConfig, MCPServerConfig, TransportType
+from write_sense_agent.core.config import (
+    _STDIO_TRANSPORTS,
+    _URL_TRANSPORTS,
+    AgentConfig,
+    MCPServerConfig,
+    TransportType,
+)
+from write_sense_agent.core.llm import get_llm
 
 
 logger = logging.getLogger(__name__)
@@ -34,6 +43,7 @@ class MCPAgent:
         config: AgentConfig,
         server_configs: Dict[str, MCPServerConfig],
         system_prompt: Optional[str] = None,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
     ) -> None:
         """
         Initialize the MCP Agent.
@@ -43,17 +53,27 @@ class MCPAgent:
             config: Agent configuration
             server_configs: MCP server configurations
             system_prompt: Custom system prompt for this agent
+            checkpointer: Shared checkpointer; defaults to a private MemorySaver when memory is enabled
         """
         self.name = name
         self.config = config
         self.server_configs = server_configs
+        self.server_names: Tuple[str, ...] = tuple(server_configs)
         self.system_prompt = system_prompt or self._default_system_prompt()
         
         # Agent components
-        self.client: Optional[MultiServerMCPClient] = None
         self.tools: List[BaseTool] = []
         self.agent = None
-        self.checkpointer = MemorySaver() if config.orchestrator.enable_memory else None
+        
+        # Precomputed by initialize(); tools don't change until the next initialize()
+        self._tool_descriptions: Tuple[Dict[str, str], ...] = ()
+        if checkpointer is None and config.orchestrator.enable_memory:
+            checkpointer = MemorySaver()
+        self.checkpointer = checkpointer
+        
+        # Tasks holding MCP sessions open for the agent's lifetime
+        self._session_tasks: List[asyncio.Task] = []
+        self._closing = asyncio.Event()
         
         # Create LLM
         self.llm = self._create_llm()
@@ -62,48 +82,31 @@ class MCPAgent:
     
     def _default_system_prompt(self) -> str:
         """Generate default system prompt for this agent."""
-        server_names = list(self.server_configs.keys())
         return (
             f"You are a specialized agent named '{self.name}' that can access tools from "
-            f"the following MCP servers: {', '.join(server_names)}. "
+            f"the following MCP servers: {', '.join(self.server_names)}. "
             f"Use the available tools to help answer user questions effectively. "
             f"Provide clear, accurate responses based on the tool results."
         )
     
     def _create_llm(self) -> Any:
         """Create the language model based on configuration."""
-        llm_config = self.config.mcp_agents_llm  # Use MCP agents-specific LLM config
-        
-        if llm_config.provider.value == "anthropic":
-            from langchain_anthropic import ChatAnthropic
-            return ChatAnthropic(
-                model=llm_config.model,
-                temperature=llm_config.temperature,
-                max_tokens=llm_config.max_tokens,
-                timeout=llm_config.timeout,
-                api_key=llm_config.api_key,
-            )
-        elif llm_config.provider.value == "openai":
-            from langchain_openai import ChatOpenAI
-            return ChatOpenAI(
-                model=llm_config.model,
-                temperature=llm_config.temperature,
-                max_tokens=llm_config.max_tokens,
-                timeout=llm_config.timeout,
-                api_key=llm_config.api_key,
-                base_url=llm_config.base_url,
-            )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {llm_config.provider}")
+        # Agents with the same LLM settings share one client
+        return get_llm(self.config.mcp_agents_llm)  # Use MCP agents-specific LLM config
     
     async def initialize(self) -> None:
         """Initialize the agent by connecting to MCP servers and loading tools."""
+        # Close sessions left by an earlier initialize() so their server processes don't leak,
+        # then start with a fresh event so the new sessions stay open until cleanup()
+        await self._close_sessions()
+        self._closing = asyncio.Event()
+        
         try:
             if len(self.server_configs) == 1:
                 # Single server - use direct connection
                 await self._initialize_single_server()
             else:
-                # Multiple servers - use MultiServerMCPClient
+                # Multiple servers - connect to all of them concurrently
                 await self._initialize_multi_server()
             
             # Create the ReAct agent
@@ -126,15 +129,24 @@ class MCPAgent:
                 checkpointer=self.checkpointer,
             )
             logger.warning(f"Agent '{self.name}' initialized with 0 tools (fallback mode)")
+        
+        self._tool_descriptions = tuple(
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "args": str(tool.args) if hasattr(tool, "args") else "N/A",
+            }
+            for tool in self.tools
+        )
     
     async def _initialize_single_server(self) -> None:
         """Initialize agent with a single MCP server."""
         server_name, server_config = next(iter(self.server_configs.items()))
         
         try:
-            if server_config.transport == TransportType.STDIO:
+            if server_config.transport in _STDIO_TRANSPORTS:
                 await self._load_stdio_tools(server_config)
-            elif server_config.transport in (TransportType.SSE, TransportType.STREAMABLE_HTTP):
+            elif server_config.transport in _URL_TRANSPORTS:
                 await self._load_http_tools(server_config)
             else:
                 raise ValueError(f"Unsupported transport type: {server_config.transport}")
@@ -143,55 +155,54 @@ class MCPAgent:
             self.tools = []  # Fallback to empty tools
     
     async def _initialize_multi_server(self) -> None:
-        """Initialize agent with multiple MCP servers using MultiServerMCPClient."""
-        try:
-            # Convert server configs to MultiServerMCPClient format
-            client_config = {}
-            for name, config in self.server_configs.items():
-                if config.transport == TransportType.STDIO:
-                    client_config[name] = {
-                        "command": config.command,
-                        "args": config.args,
-                        "transport": "stdio",
-                    }
-                    if config.env:
-                        client_config[name]["env"] = config.env
-                elif config.transport == TransportType.SSE:
-                    client_config[name] = {
-                        "url": config.url,
-                        "transport": "sse",
-                    }
-                elif config.transport == TransportType.STREAMABLE_HTTP:
-                    client_config[name] = {
-                        "url": config.url,
-                        "transport": "streamable_http",
-                    }
-            
-            # Initialize client
-            self.client = MultiServerMCPClient(client_config)
-            await self.client.__aenter__()
-            
-            # Load tools
-            self.tools = self.client.get_tools()
-        except Exception as e:
-            logger.error(f"Failed to initialize multi-server client: {e}")
-            self.tools = []  # Fallback to empty tools
+        """Initialize agent with multiple MCP servers, connecting to them concurrently."""
+        names = list(self.server_configs)
+        results = await asyncio.gather(
+            *(self._load_server_tools(config) for config in self.server_configs.values()),
+            return_exceptions=True,
+        )
+        
+        # Keep the tools of every server that connected; one failure doesn't sink the rest
+        tools: List[BaseTool] = []
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to initialize server '{name}': {result}")
+                continue
+            tools.extend(result)
+        self.tools = tools
+    
+    async def _load_server_tools(self, server_config: MCPServerConfig) -> List[BaseTool]:
+        """Connect to one server of a multi-server agent and return its tools."""
+        if server_config.transport in _STDIO_TRANSPORTS:
+            server_params = StdioServerParameters(
+                command=server_config.command,
+                args=server_config.args or [],
+                env=server_config.env or None,
+            )
+            open_transport = lambda: stdio_client(server_params)
+        elif server_config.transport == TransportType.SSE:
+            open_transport = lambda: sse_client(server_config.url)
+        elif server_config.transport == TransportType.STREAMABLE_HTTP:
+            open_transport = lambda: streamablehttp_client(server_config.url)
+        else:
+            raise ValueError(f"Unsupported transport type: {server_config.transport}")
+        
+        # Use a timeout to prevent hanging
+        async with asyncio.timeout(30):  # 30 second timeout
+            return await self._connect(open_transport)
     
     async def _load_stdio_tools(self, server_config: MCPServerConfig) -> None:
         """Load tools from a stdio MCP server."""
         try:
             server_params = StdioServerParameters(
                 command=server_config.command,
-                args=server_config.args,
+                args=server_config.args or [],
                 env=server_config.env or None,
             )
             
             # Use a timeout to prevent hanging
             async with asyncio.timeout(30):  # 30 second timeout
-                async with stdio_client(server_params) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        self.tools = await load_mcp_tools(session)
+                self.tools = await self._connect(lambda: stdio_client(server_params))
         except asyncio.TimeoutError:
             logger.error(f"Timeout while loading stdio tools from {server_config.command}")
             self.tools = []  # Fallback to empty tools
@@ -207,14 +218,44 @@ class MCPAgent:
         try:
             # Use a timeout to prevent hanging
             async with asyncio.timeout(30):  # 30 second timeout
-                async with streamablehttp_client(server_config.url) as (read, write, _):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        self.tools = await load_mcp_tools(session)
+                self.tools = await self._connect(lambda: streamablehttp_client(server_config.url))
         except Exception as e:
             logger.error(f"Failed to load HTTP tools: {e}")
             self.tools = []  # Fallback to empty tools
     
+    async def _connect(self, open_transport: Callable[[], Any]) -> List[BaseTool]:
+        """
+        Open an MCP session that stays alive until cleanup() and return its tools.
+        
+        Loaded tools call back into their session, so closing it after loading
+        would make every tool call respawn the server and redo the handshake.
+        """
+        ready = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(self._hold_session(open_transport, ready))
+        self._session_tasks.append(task)
+        try:
+            return await ready
+        except BaseException:
+            task.cancel()
+            raise
+    
+    async def _hold_session(self, open_transport: Callable[[], Any], ready: asyncio.Future) -> None:
+        """Own one MCP transport and session; anyio requires exiting them in the task that entered them."""
+        try:
+            async with AsyncExitStack() as stack:
+                streams = await stack.enter_async_context(open_transport())
+                session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+                await session.initialize()
+                tools = await load_mcp_tools(session)
+                if not ready.done():
+                    ready.set_result(tools)
+                await self._closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"MCP session for agent '{self.name}' closed with error: {e}")
+    
     async def invoke(
         self,
         messages: Sequence[BaseMessage],
@@ -268,31 +309,28 @@ class MCPAgent:
         """Get the list of available tools."""
         return self.tools
     
-    def get_tool_descriptions(self) -> List[Dict[str, str]]:
+    def get_tool_descriptions(self) -> Sequence[Dict[str, str]]:
         """Get descriptions of available tools."""
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "args": str(tool.args) if hasattr(tool, "args") else "N/A",
-            }
-            for tool in self.tools
-        ]
+        return self._tool_descriptions
     
     async def cleanup(self) -> None:
         """Clean up resources."""
-        if self.client:
-            try:
-                await self.client.__aexit__(None, None, None)
-            except Exception as e:
-                logger.warning(f"Error cleaning up MCP client: {e}")
+        await self._close_sessions()
+        self._tool_descriptions = ()
         
         logger.info(f"Cleaned up MCP Agent '{self.name}'")
     
+    async def _close_sessions(self) -> None:
+        """Let session tasks close their sessions and stop their server processes."""
+        self._closing.set()
+        if self._session_tasks:
+            await asyncio.gather(*self._session_tasks, return_exceptions=True)
+            self._session_tasks.clear()
+    
     def __repr__(self) -> str:
         """String representation of the agent."""
         return (
             f"MCPAgent(name='{self.name}', "
-            f"servers={list(self.server_configs.keys())}, "
+            f"servers={list(self.server_names)}, "
             f"tools={len(self.tools)})"
         ) 
\ No newline at end of file
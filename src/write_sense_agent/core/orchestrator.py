@@ -1,35 +1,53 @@
 """Orchestrator agent for coordinating multiple MCP agents."""
 
 import asyncio
+import json
 import logging
-from typing import Any, Dict, List, Optional, Sequence, Union
+import operator
+import uuid
+from typing import Annotated, Any, Dict, List, Optional, Sequence, Tuple, Union
 
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.tools import tool
 from langchain_tavily import TavilySearch
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, MessagesState
 from langgraph.prebuilt import create_react_agent
 from langgraph.types import Command
 
 from write_sense_agent.core.config import AgentConfig
+from write_sense_agent.core.llm import get_llm
 from write_sense_agent.core.mcp_agent import MCPAgent
 
 
 logger = logging.getLogger(__name__)
 
+# Maximum sub-agents consulted at once by the batch delegation tool
+MAX_CONCURRENT_DELEGATIONS = 4
+
+# Seconds each MCP agent gets to close its sessions before cleanup gives up on it
+AGENT_CLEANUP_TIMEOUT = 5.0
+
+
+def _coerce_messages(messages: Union[str, Sequence[BaseMessage]]) -> Sequence[BaseMessage]:
+    """Wrap a plain string query in a HumanMessage; message sequences pass through unchanged."""
+    if isinstance(messages, str):
+        return [HumanMessage(content=messages)]
+    return messages
+
 
 class OrchestratorState(MessagesState):
     """Extended state for the orchestrator with agent tracking."""
     
-    # Track which agents have been consulted
-    consulted_agents: List[str] = []
+    # Track which agents have been consulted (updates are appended)
+    consulted_agents: Annotated[List[str], operator.add]
     
     # Track the current step in orchestration
-    orchestration_step: int = 0
+    orchestration_step: int
     
     # Store intermediate results
-    agent_results: Dict[str, Any] = {}
+    agent_results: Dict[str, Any]
 
 
 class OrchestratorAgent:
@@ -40,51 +58,40 @@ class OrchestratorAgent:
     MCP agents based on their capabilities, then synthesizes the results.
     """
     
-    def __init__(self, config: AgentConfig) -> None:
+    def __init__(self, config: AgentConfig, checkpointer: Optional[BaseCheckpointSaver] = None) -> None:
         """
         Initialize the Orchestrator Agent.
         
         Args:
             config: Agent configuration
+            checkpointer: Shared checkpointer; defaults to a private MemorySaver when memory is enabled
         """
         self.config = config
         self.mcp_agents: Dict[str, MCPAgent] = {}
         self.llm = self._create_llm()
-        self.checkpointer = MemorySaver() if config.orchestrator.enable_memory else None
+        if checkpointer is None and config.orchestrator.enable_memory:
+            checkpointer = MemorySaver()
+        self.checkpointer = checkpointer
         
         # Create orchestrator tools for agent delegation
         self.orchestrator_tools = []
+        self._orchestrator_tool_names: Tuple[str, ...] = ()
         
         # Main orchestrator agent
         self.agent = None
         
+        # Sole MCP agent whose tools the orchestrator calls itself, set by initialize()
+        self._inlined_agent: Optional[MCPAgent] = None
+        
+        # Generated on first use; reset whenever the set of agents or their tools changes
+        self._system_prompt: Optional[str] = None
+        
         logger.info("Initialized Orchestrator Agent")
     
     def _create_llm(self) -> Any:
         """Create the language model based on configuration."""
-        llm_config = self.config.orchestrator_llm  # Use orchestrator-specific LLM config
-        
-        if llm_config.provider.value == "anthropic":
-            from langchain_anthropic import ChatAnthropic
-            return ChatAnthropic(
-                model=llm_config.model,
-                temperature=llm_config.temperature,
-                max_tokens=llm_config.max_tokens,
-                timeout=llm_config.timeout,
-                api_key=llm_config.api_key,
-            )
-        elif llm_config.provider.value == "openai":
-            from langchain_openai import ChatOpenAI
-            return ChatOpenAI(
-                model=llm_config.model,
-                temperature=llm_config.temperature,
-                max_tokens=llm_config.max_tokens,
-                timeout=llm_config.timeout,
-                api_key=llm_config.api_key,
-                base_url=llm_config.base_url,
-            )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {llm_config.provider}")
+        # Agents with the same LLM settings share one client
+        return get_llm(self.config.orchestrator_llm)  # Use orchestrator-specific LLM config
     
     def add_mcp_agent(self, agent: MCPAgent) -> None:
         """
@@ -94,6 +101,7 @@ class OrchestratorAgent:
             agent: MCP agent to add
         """
         self.mcp_agents[agent.name] = agent
+        self._system_prompt = None
         
         # Create delegation tool for this agent
         self._create_delegation_tool(agent)
@@ -105,10 +113,6 @@ class OrchestratorAgent:
         agent_name = agent.name
         agent_obj = agent
         
-        # Get tool descriptions for better delegation
-        tool_descriptions = agent.get_tool_descriptions()
-        tools_summary = ", ".join([t["name"] for t in tool_descriptions]) if tool_descriptions else "various tools"
-        
         # Create the delegation function with proper naming
         @tool(f"delegate_to_{agent_name}")
         async def delegate_to_agent_func(query: str) -> str:
@@ -121,33 +125,90 @@ class OrchestratorAgent:
             Returns:
                 The agent's response
             """
-            try:
-                # Create message
-                messages = [HumanMessage(content=query)]
-                
-                # Invoke agent asynchronously
-                result = await agent_obj.invoke(messages)
-                
-                # Extract the response
-                if "messages" in result and result["messages"]:
-                    last_message = result["messages"][-1]
-                    if isinstance(last_message, AIMessage):
-                        return last_message.content
-                
-                return "Agent completed the task but provided no response."
-                
-            except Exception as e:
-                logger.error(f"Error delegating to agent {agent_name}: {e}")
-                return f"Error occurred while consulting {agent_name}: {str(e)}"
+            return await self._consult_agent(agent_obj, query)
         
         # Update the description after creation
-        delegate_to_agent_func.description = (
-            f"Delegate a query to the {agent_name} specialized MCP agent. "
+        delegate_to_agent_func.description = self._delegation_description(agent)
+        
+        self.orchestrator_tools.append(delegate_to_agent_func)
+        self._orchestrator_tool_names += (delegate_to_agent_func.name,)
+    
+    @staticmethod
+    def _delegation_description(agent: MCPAgent) -> str:
+        """Describe a delegation tool using the agent's currently loaded tools."""
+        tools_summary = ", ".join(t["name"] for t in agent.get_tool_descriptions()) or "various tools"
+        return (
+            f"Delegate a query to the {agent.name} specialized MCP agent. "
             f"This agent has access to: {tools_summary}. "
-            f"Use this when the user's request involves {agent_name.replace('_', ' ')} related tasks."
+            f"Use this when the user's request involves {agent.name.replace('_', ' ')} related tasks."
         )
+    
+    async def _consult_agent(self, agent: MCPAgent, query: str) -> str:
+        """Send a query to an MCP agent and return its final response text."""
+        timeout = self.config.orchestrator.delegation_timeout
+        try:
+            # Create message
+            messages = [HumanMessage(content=query)]
+            
+            # Each delegated run gets its own checkpoint thread: the checkpointer may be shared,
+            # and runs started outside a graph or in parallel tool calls have no thread of their own
+            config = {
+                **self.config.get_langgraph_config(),
+                "configurable": {"thread_id": f"{agent.name}:{uuid.uuid4().hex}"},
+            }
+            
+            # Invoke agent asynchronously; a slow agent must not stall the orchestrator
+            result = await asyncio.wait_for(agent.invoke(messages, config=config), timeout=timeout)
+            
+            # Extract the response
+            if "messages" in result and result["messages"]:
+                last_message = result["messages"][-1]
+                if isinstance(last_message, AIMessage):
+                    return last_message.content
+            
+            return "Agent completed the task but provided no response."
+            
+        except asyncio.TimeoutError:
+            logger.error("Timed out after %ss delegating to agent %s", timeout, agent.name)
+            return f"{agent.name} did not respond within {timeout} seconds."
+        except Exception as e:
+            logger.error("Error delegating to agent %s: %s", agent.name, e)
+            return f"Error occurred while consulting {agent.name}: {e}"
+    
+    def _create_batch_delegation_tool(self) -> Any:
+        """Create a tool that consults several MCP agents concurrently."""
         
-        self.orchestrator_tools.append(delegate_to_agent_func)
+        @tool("delegate_batch")
+        async def delegate_batch(queries: Dict[str, str]) -> str:
+            """
+            Delegate queries to several specialized MCP agents at once.
+            
+            Args:
+                queries: Mapping of agent name to the question or task for that agent
+                
+            Returns:
+                JSON object with each agent's response
+            """
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_DELEGATIONS)
+            
+            async def consult(agent_name: str, query: str) -> str:
+                agent = self.mcp_agents.get(agent_name)
+                if agent is None:
+                    return f"Unknown agent '{agent_name}'. Available agents: {', '.join(self.mcp_agents)}"
+                async with semaphore:
+                    return await self._consult_agent(agent, query)
+            
+            responses = await asyncio.gather(
+                *(consult(name, query) for name, query in queries.items())
+            )
+            return json.dumps(dict(zip(queries, responses)), ensure_ascii=False)
+        
+        delegate_batch.description = (
+            "Delegate queries to several specialized MCP agents concurrently. "
+            f"Pass a mapping of agent name to query; available agents: {', '.join(self.mcp_agents)}. "
+            "Use this instead of separate delegate_to_* calls when a request needs two or more agents."
+        )
+        return delegate_batch
     
     def _create_additional_tools(self) -> List[Any]:
         """Create additional tools for the orchestrator."""
@@ -178,12 +239,53 @@ class OrchestratorAgent:
     
     async def initialize(self) -> None:
         """Initialize the orchestrator agent."""
-        # Initialize all MCP agents
-        for agent in self.mcp_agents.values():
-            await agent.initialize()
+        # Initialize all MCP agents concurrently; startup takes as long as the slowest server
+        agents = list(self.mcp_agents.values())
+        results = await asyncio.gather(
+            *(agent.initialize() for agent in agents), return_exceptions=True
+        )
         
-        # Combine all tools
-        all_tools = self.orchestrator_tools + self._create_additional_tools()
+        # Agents now have their tools loaded, so the delegation guidelines must be regenerated
+        self._system_prompt = None
+        
+        # Drop agents that failed to initialize, along with their delegation tools
+        failed = set()
+        for agent, result in zip(agents, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to initialize MCP agent '%s': %s", agent.name, result)
+                failed.add(agent.name)
+                del self.mcp_agents[agent.name]
+        if failed:
+            failed_tools = {f"delegate_to_{name}" for name in failed}
+            self.orchestrator_tools = [
+                t for t in self.orchestrator_tools if t.name not in failed_tools
+            ]
+            self._orchestrator_tool_names = tuple(t.name for t in self.orchestrator_tools)
+        
+        # A single agent's tools are called directly; delegating would add a full LLM loop per turn
+        if self.config.orchestrator.inline_single_agent and len(self.mcp_agents) == 1:
+            self._inlined_agent = next(iter(self.mcp_agents.values()))
+            routing_tools = list(self._inlined_agent.get_tools())
+            self._orchestrator_tool_names = tuple(t.name for t in routing_tools)
+        else:
+            self._inlined_agent = None
+            
+            # Tools are loaded now, so describe each delegation tool by what its agent can actually do
+            for delegation_tool in self.orchestrator_tools:
+                agent = self.mcp_agents[delegation_tool.name[len("delegate_to_"):]]
+                delegation_tool.description = self._delegation_description(agent)
+            
+            routing_tools = list(self.orchestrator_tools)
+            self._orchestrator_tool_names = tuple(t.name for t in self.orchestrator_tools)
+            if len(self.mcp_agents) > 1:
+                routing_tools.append(self._create_batch_delegation_tool())
+        
+        # Combine all tools; tools are dispatched by name, so an additional tool must not
+        # shadow an inlined MCP tool of the same name (e.g. tavily_search)
+        routing_names = {t.name for t in routing_tools}
+        all_tools = routing_tools + [
+            t for t in self._create_additional_tools() if t.name not in routing_names
+        ]
         
         # Generate dynamic system prompt based on actual registered agents
         dynamic_prompt = self._generate_dynamic_system_prompt()
@@ -219,9 +321,7 @@ class OrchestratorAgent:
         if not self.agent:
             raise RuntimeError("Orchestrator not initialized. Call initialize() first.")
         
-        # Convert string to message if needed
-        if isinstance(messages, str):
-            messages = [HumanMessage(content=messages)]
+        messages = _coerce_messages(messages)
         
         # Use default config if none provided
         if config is None:
@@ -247,9 +347,7 @@ class OrchestratorAgent:
         if not self.agent:
             raise RuntimeError("Orchestrator not initialized. Call initialize() first.")
         
-        # Convert string to message if needed
-        if isinstance(messages, str):
-            messages = [HumanMessage(content=messages)]
+        messages = _coerce_messages(messages)
         
         # Use default config if none provided
         if config is None:
@@ -264,22 +362,31 @@ class OrchestratorAgent:
         
         for name, agent in self.mcp_agents.items():
             capabilities[name] = {
-                "servers": list(agent.server_configs.keys()),
+                "servers": agent.server_names,
                 "tools": agent.get_tool_descriptions(),
                 "tool_count": len(agent.tools),
             }
         
         return capabilities
     
-    def get_orchestrator_tools(self) -> List[str]:
-        """Get list of orchestrator tool names."""
-        return [tool.name for tool in self.orchestrator_tools]
+    def get_orchestrator_tools(self) -> Tuple[str, ...]:
+        """Get the orchestrator tool names."""
+        return self._orchestrator_tool_names
     
     async def cleanup(self) -> None:
         """Clean up all resources."""
-        # Clean up MCP agents
-        for agent in self.mcp_agents.values():
-            await agent.cleanup()
+        # Clean up MCP agents concurrently so their servers shut down in parallel,
+        # bounded so a hung server can't block shutdown
+        agents = list(self.mcp_agents.values())
+        results = await asyncio.gather(
+            *(asyncio.wait_for(agent.cleanup(), AGENT_CLEANUP_TIMEOUT) for agent in agents),
+            return_exceptions=True,
+        )
+        for agent, result in zip(agents, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning("Timed out cleaning up MCP agent '%s'", agent.name)
+            elif isinstance(result, Exception):
+                logger.warning("Error cleaning up MCP agent '%s': %s", agent.name, result)
         
         logger.info("Orchestrator cleanup completed")
     
@@ -297,6 +404,16 @@ class OrchestratorAgent:
         if not self.mcp_agents:
             return "No specialized agents are currently available."
         
+        if self._inlined_agent is not None:
+            tool_names = [t["name"] for t in self._inlined_agent.get_tool_descriptions()]
+            if not tool_names:
+                return "No specialized agents are currently available."
+            return (
+                f"- No sub-agents are registered; the {self._inlined_agent.name.replace('_', ' ')} tools "
+                f"are available to you directly: {', '.join(tool_names)}. Call them yourself, and apply "
+                f"the delegation guidelines above to deciding when to use these tools."
+            )
+        
         guidelines = []
         for agent_name, agent in self.mcp_agents.items():
             tool_descriptions = agent.get_tool_descriptions()
@@ -323,31 +440,53 @@ class OrchestratorAgent:
             else:
                 guidelines.append(f"- For general tasks that may fit {agent_name.replace('_', ' ')} domain, use delegate_to_{agent_name}")
         
+        if len(self.mcp_agents) > 1:
+            guidelines.append(
+                "- When a request needs two or more of these agents, use delegate_batch with "
+                "{agent_name: query} so they are consulted concurrently"
+            )
+        
         return "\n".join(guidelines)
 
     def _generate_dynamic_system_prompt(self) -> str:
         """Generate a complete system prompt with dynamic delegation guidelines."""
+        if self._system_prompt is not None:
+            return self._system_prompt
+        
         # Start with the configured system prompt that includes format requirements
         base_prompt = self.config.orchestrator.system_prompt
         
         # Add dynamic delegation guidelines
         delegation_guidelines = self._generate_dynamic_delegation_guidelines()
-        dynamic_section = f"\n\nAVAILABLE DELEGATION OPTIONS:\n{delegation_guidelines}\n\n"
-        
-        # Additional guidance for demonstration
-        demonstration_guidance = (
-            "When a user asks about your capabilities or what you can do, ALWAYS demonstrate by using "
-            "the appropriate delegation tools to show your specialized agents in action. Don't just describe "
-            "what you can do - actually delegate to the relevant agents to prove your capabilities.\n\n"
-            "Remember: You MUST maintain the exact Action/Content format specified above, even when delegating to sub-agents."
-        )
+        if self._inlined_agent is not None:
+            dynamic_section = f"\n\nAVAILABLE TOOLS:\n{delegation_guidelines}\n\n"
+            
+            # Additional guidance for demonstration
+            demonstration_guidance = (
+                "When a user asks about your capabilities or what you can do, ALWAYS demonstrate by using "
+                "the appropriate tools. Don't just describe what you can do - actually use the tools to prove "
+                "your capabilities.\n\n"
+                "Remember: You MUST maintain the exact Action/Content format specified above, even when using tools."
+            )
+        else:
+            dynamic_section = f"\n\nAVAILABLE DELEGATION OPTIONS:\n{delegation_guidelines}\n\n"
+            
+            # Additional guidance for demonstration
+            demonstration_guidance = (
+                "When a user asks about your capabilities or what you can do, ALWAYS demonstrate by using "
+                "the appropriate delegation tools to show your specialized agents in action. Don't just describe "
+                "what you can do - actually delegate to the relevant agents to prove your capabilities.\n\n"
+                "Remember: You MUST maintain the exact Action/Content format specified above, even when delegating to sub-agents."
+            )
         
         full_prompt = base_prompt + dynamic_section + demonstration_guidance
         
         # Log the generated prompt for debugging
-        logger.info("Generated dynamic system prompt with delegation guidelines:")
-        logger.info(f"Registered agents: {list(self.mcp_agents.keys())}")
-        logger.info("Dynamic delegation section:")
-        logger.info(delegation_guidelines)
-        
-        return full_prompt 
\ No newline at end of file
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Generated dynamic system prompt with delegation guidelines:")
+            logger.debug("Registered agents: %s", list(self.mcp_agents.keys()))
+            logger.debug("Dynamic delegation section:")
+            logger.debug(delegation_guidelines)
+        
+        self._system_prompt = full_prompt
+        return full_prompt
\ No newline at end of file
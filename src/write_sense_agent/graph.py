@@ -5,108 +5,267 @@ This module defines the primary agent graph that can be deployed
 using langgraph-cli for production hosting.
 """
 
+import asyncio
+import logging
 import os
-import glob
-import inspect
+import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from langgraph.checkpoint.memory import MemorySaver
 
 from write_sense_agent.core.config import AgentConfig, TransportType
 from write_sense_agent.core.mcp_agent import MCPAgent
 from write_sense_agent.core.orchestrator import OrchestratorAgent
 
 
-def discover_mcp_servers(mcp_servers_dir: str = None) -> Dict[str, Dict[str, Any]]:
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ServerSpec:
+    """Discovered MCP server; immutable so cached discovery results can be shared."""
+    
+    name: str
+    transport: TransportType
+    command: str
+    args: Tuple[str, ...]
+    env: Optional[FrozenSet[Tuple[str, str]]]  # None inherits the default server environment
+
+
+# From src/write_sense_agent/graph.py, go up to write-sense-agent/, then to mcp_servers/
+_DEFAULT_MCP_SERVERS_DIR = Path(__file__).resolve().parent.parent.parent / "mcp_servers"
+
+# Interpreter that runs discovered servers; the current one avoids a PATH search per spawn
+# and keeps servers on the same environment as the agent
+_PYTHON_EXECUTABLE = sys.executable or "python"
+
+# Environment variables passed to discovered servers whose name contains any of
+# the keywords, with the default used when the variable is unset
+_ENV_RULES: Mapping[Tuple[str, ...], Mapping[str, str]] = MappingProxyType({
+    ("search", "web"): MappingProxyType({"TAVILY_API_KEY": ""}),  # Search servers need API keys
+})
+
+
+# Seconds a scan of the default MCP servers directory is served as-is; past the
+# soft TTL it is still served while a background rescan runs, past the hard TTL
+# callers wait for a fresh scan
+DISCOVERY_SOFT_TTL = 30.0
+DISCOVERY_HARD_TTL = 300.0
+
+# Last scan of the default MCP servers directory, when it was taken or last
+# revalidated, and the directory fingerprint it was built from
+_discovery_cache: Optional[Mapping[str, ServerSpec]] = None
+_discovery_cache_ts = 0.0
+_discovery_fingerprint: Optional[int] = None
+
+# Background rescan started when a stale scan was served
+_discovery_refresh_task: Optional[asyncio.Task] = None
+_discovery_lock = asyncio.Lock()
+
+# Last agent configuration, together with the discovery result it was built from
+_config_cache: Optional[Tuple[Mapping[str, ServerSpec], AgentConfig]] = None
+
+_cache_stats = {"discovery_hits": 0, "discovery_misses": 0, "config_hits": 0, "config_misses": 0}
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Get hit and miss counts of the discovery and configuration caches."""
+    return dict(_cache_stats)
+
+
+async def discover_mcp_servers(mcp_servers_dir: str = None) -> Mapping[str, ServerSpec]:
     """
     Dynamically discover MCP servers from the mcp_servers directory.
     
+    Scans of the default directory are cached and revalidated in the background
+    once stale; the directory is only rescanned when its server files change,
+    so the result is shared between calls.
+    
     Args:
         mcp_servers_dir: Path to the MCP servers directory (defaults to ./mcp_servers)
         
     Returns:
-        Dictionary of server configurations keyed by server name
-    """
-    if mcp_servers_dir is None:
-        # Get the project root directory
-        current_file = Path(__file__)
-        # From src/write_sense_agent/graph.py, go up to write-sense-agent/, then to mcp_servers/
-        project_root = current_file.parent.parent.parent  # Go up to write-sense-agent/
-        mcp_servers_dir = project_root / "mcp_servers"
-    else:
-        mcp_servers_dir = Path(mcp_servers_dir)
+        Read-only mapping of server specs keyed by server name
+    """
+    global _discovery_refresh_task
+    if mcp_servers_dir is not None:
+        return await _scan_mcp_servers(Path(mcp_servers_dir))
+    mcp_servers_dir = _DEFAULT_MCP_SERVERS_DIR
     
-    discovered_servers = {}
+    if _discovery_cache is not None:
+        age = time.monotonic() - _discovery_cache_ts
+        if age < DISCOVERY_SOFT_TTL:
+            _cache_stats["discovery_hits"] += 1
+            return _discovery_cache
+        
+        # Serve the stale scan while it is rescanned
+        if age < DISCOVERY_HARD_TTL:
+            if _discovery_refresh_task is None or _discovery_refresh_task.done():
+                _discovery_refresh_task = asyncio.create_task(_refresh_discovery_bg(mcp_servers_dir))
+            _cache_stats["discovery_hits"] += 1
+            return _discovery_cache
+    
+    # Concurrent callers wait for one scan instead of each running their own
+    async with _discovery_lock:
+        if _discovery_cache is not None and time.monotonic() - _discovery_cache_ts < DISCOVERY_HARD_TTL:
+            _cache_stats["discovery_hits"] += 1
+            return _discovery_cache
+        if await _refresh_discovery(mcp_servers_dir):
+            _cache_stats["discovery_misses"] += 1
+        else:
+            _cache_stats["discovery_hits"] += 1
+        return _discovery_cache
+
+
+async def _refresh_discovery_bg(mcp_servers_dir: Path) -> None:
+    """Refresh the cached scan in the background."""
+    try:
+        await _refresh_discovery(mcp_servers_dir)
+    except Exception as e:
+        logger.warning("Background MCP server discovery failed: %s", e)
+
+
+async def _refresh_discovery(mcp_servers_dir: Path) -> bool:
+    """
+    Rescan the default MCP servers directory if it changed since the cached scan.
+    
+    Returns:
+        True if the directory was rescanned, False if the cached scan was still current
+    """
+    global _discovery_cache, _discovery_cache_ts, _discovery_fingerprint
+    fingerprint = await asyncio.to_thread(_dir_fingerprint, mcp_servers_dir)
+    if _discovery_cache is not None and fingerprint is not None and fingerprint == _discovery_fingerprint:
+        # Keep the same mapping so the configuration built from it stays cached
+        _discovery_cache_ts = time.monotonic()
+        return False
+    
+    _discovery_cache = await _scan_mcp_servers(mcp_servers_dir)
+    _discovery_cache_ts = time.monotonic()
+    _discovery_fingerprint = fingerprint
+    return True
+
+
+def _dir_fingerprint(mcp_servers_dir: Path) -> Optional[int]:
+    """
+    Fingerprint the server files in a directory from one listing, without opening them.
+    
+    Covers the names, sizes and modification times of *_server.py files plus the
+    environment variables discovery passes to servers. Returns None if the
+    directory can't be listed, so the caller always rescans.
+    """
+    files = []
+    try:
+        with os.scandir(mcp_servers_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith("_server.py"):
+                    stat = entry.stat()
+                    files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    except OSError:
+        return None
+    files.sort()
     
-    print(f"Looking for MCP servers in: {mcp_servers_dir}")
+    env = tuple(os.getenv(name) for env_defaults in _ENV_RULES.values() for name in env_defaults)
+    return hash((tuple(files), env))
+
+
+async def _scan_mcp_servers(mcp_servers_dir: Path) -> Mapping[str, ServerSpec]:
+    """Scan a directory for MCP server scripts and build their configurations."""
+    discovered_servers = {}
     
-    if not mcp_servers_dir.exists():
-        print(f"Warning: MCP servers directory not found: {mcp_servers_dir}")
-        return discovered_servers
+    logger.debug("Looking for MCP servers in: %s", mcp_servers_dir)
     
-    # Find all Python files in the mcp_servers directory
-    server_files = list(mcp_servers_dir.glob("*_server.py"))
+    # Find all Python files in the mcp_servers directory; the listing is the only filesystem access
+    try:
+        server_files = await asyncio.to_thread(_list_server_files, mcp_servers_dir)
+    except FileNotFoundError:
+        logger.warning("MCP servers directory not found: %s", mcp_servers_dir)
+        return MappingProxyType(discovered_servers)
+    except OSError as e:
+        logger.warning("Could not list MCP servers directory %s: %s", mcp_servers_dir, e)
+        return MappingProxyType(discovered_servers)
     
+    # Building a spec does no I/O, so errors here are bugs and are not swallowed
     for server_file in server_files:
-        try:
-            # Extract server name from filename (remove _server.py suffix)
-            server_name = server_file.stem.replace("_server", "")
-            
-            # Check if the file has a shebang and appears to be executable
-            with open(server_file, 'r') as f:
-                first_line = f.readline().strip()
-                
-            # Determine if it's a FastMCP server or regular stdio server
-            server_config = {
-                "name": server_name,
-                "transport": TransportType.STDIO,
-                "command": "python",
-                "args": [str(server_file)],
-                "env": {}
-            }
-            
-            # Add any environment variables that might be needed
-            # You can extend this logic based on your server requirements
-            if "search" in server_name.lower() or "web" in server_name.lower():
-                # For search servers, might need API keys
-                server_config["env"]["TAVILY_API_KEY"] = os.getenv("TAVILY_API_KEY", "")
-            
-            discovered_servers[server_name] = server_config
-            print(f"Discovered MCP server: {server_name} -> {server_file}")
-            
-        except Exception as e:
-            print(f"Warning: Could not process MCP server file {server_file}: {e}")
-            continue
+        server_spec = _inspect_server_file(server_file)
+        discovered_servers[server_spec.name] = server_spec
+        logger.debug("Discovered MCP server: %s -> %s", server_spec.name, server_file)
     
-    return discovered_servers
+    return MappingProxyType(discovered_servers)
+
+
+def _list_server_files(mcp_servers_dir: Path) -> List[Path]:
+    """List the *_server.py files in a directory."""
+    # scandir reports file types from the directory entries, without a glob match or stat per entry
+    with os.scandir(mcp_servers_dir) as entries:
+        return [
+            Path(entry.path)
+            for entry in entries
+            if entry.name.endswith("_server.py") and entry.is_file()
+        ]
 
 
-def get_agent_config() -> AgentConfig:
+def _inspect_server_file(server_file: Path) -> ServerSpec:
+    """Build the spec for one MCP server script."""
+    # Extract server name from filename (remove _server.py suffix)
+    server_name = server_file.stem.replace("_server", "")
+    
+    # Add any environment variables that might be needed; extend _ENV_RULES for new servers
+    env = None
+    name_lower = server_name.lower()
+    for keywords, env_defaults in _ENV_RULES.items():
+        if any(keyword in name_lower for keyword in keywords):
+            env = env or {}
+            env.update({name: os.getenv(name, default) for name, default in env_defaults.items()})
+    
+    return ServerSpec(
+        name=server_name,
+        transport=TransportType.STDIO,
+        command=_PYTHON_EXECUTABLE,
+        args=(str(server_file),),
+        env=frozenset(env.items()) if env is not None else None,
+    )
+
+
+async def get_agent_config() -> AgentConfig:
     """
     Get or create the agent configuration with dynamic MCP server discovery.
     
+    The configuration is reused until server discovery produces a new result.
+    
     Returns:
-        Configured AgentConfig instance
+        Configured AgentConfig instance (shared between calls, do not mutate)
     """
+    global _config_cache
+    discovered_servers = await discover_mcp_servers()
+    if _config_cache is not None and _config_cache[0] is discovered_servers:
+        _cache_stats["config_hits"] += 1
+        return _config_cache[1]
+    _cache_stats["config_misses"] += 1
+    
     # Initialize configuration from environment
     config = AgentConfig.from_env()
     
-    # Dynamically discover and add MCP servers
+    # Add discovered MCP servers; servers already configured take precedence
+    for server_name, server_spec in discovered_servers.items():
+        if server_name in config.mcp_servers:
+            continue
+        config.add_mcp_server(
+            name=server_spec.name,
+            transport=server_spec.transport,
+            command=server_spec.command,
+            args=list(server_spec.args),
+            env=dict(server_spec.env) if server_spec.env is not None else None,
+        )
+        logger.info("Added MCP server: %s", server_name)
+    
     if not config.mcp_servers:
-        discovered_servers = discover_mcp_servers()
-        
-        for server_name, server_config in discovered_servers.items():
-            config.add_mcp_server(
-                name=server_config["name"],
-                transport=server_config["transport"],
-                command=server_config["command"],
-                args=server_config["args"],
-                env=server_config.get("env", {})
-            )
-            print(f"Added MCP server: {server_name}")
-
-        if not discovered_servers:
-            print("No MCP servers discovered. The agent will run without external tools.")
+        logger.warning("No MCP servers discovered. The agent will run without external tools.")
     
+    _config_cache = (discovered_servers, config)
     return config
 
 
@@ -118,10 +277,14 @@ async def create_agent_system() -> OrchestratorAgent:
         Initialized orchestrator agent
     """
     # Get configuration with dynamic server discovery
-    config = get_agent_config()
+    config = await get_agent_config()
+    
+    # One checkpointer for the whole system; each delegated sub-agent run is checkpointed
+    # under its own thread id, separate from the orchestrator's conversation threads
+    checkpointer = MemorySaver() if config.orchestrator.enable_memory else None
     
     # Create orchestrator
-    orchestrator = OrchestratorAgent(config)
+    orchestrator = OrchestratorAgent(config, checkpointer=checkpointer)
     
     # Create one MCP agent per MCP server (no grouping)
     for server_name, server_config in config.mcp_servers.items():
@@ -133,6 +296,7 @@ async def create_agent_system() -> OrchestratorAgent:
             name=agent_name,
             config=config,
             server_configs={server_name: server_config},  # Single server per agent
+            checkpointer=checkpointer,
         )
         orchestrator.add_mcp_agent(agent)
     
@@ -142,6 +306,58 @@ async def create_agent_system() -> OrchestratorAgent:
     return orchestrator
 
 
+# Agent system shared by create_graph calls, started early by warmup()
+_agent_system_task: Optional[asyncio.Task] = None
+
+
+def warmup() -> Optional[asyncio.Task]:
+    """
+    Start creating the agent system in the background on the running event loop.
+    
+    MCP servers are spawned and connected while the process is otherwise idle,
+    so the first request doesn't pay for it. A failed attempt is retried on
+    the next call.
+    
+    Returns:
+        Task resolving to the initialized orchestrator, or None outside an event loop
+    """
+    global _agent_system_task
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    
+    task = _agent_system_task
+    if (
+        task is None
+        or task.get_loop() is not loop
+        or (task.done() and (task.cancelled() or task.exception() is not None))
+    ):
+        task = _agent_system_task = loop.create_task(create_agent_system())
+    return task
+
+
+async def shutdown() -> None:
+    """
+    Clean up the shared agent system so its MCP server processes exit.
+    
+    Hosts with a shutdown hook should await this while the event loop is still
+    running; the next create_graph() call builds a fresh system.
+    """
+    global _agent_system_task
+    task, _agent_system_task = _agent_system_task, None
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        return
+    
+    if not task.done():
+        task.cancel()
+    try:
+        orchestrator = await task
+    except (Exception, asyncio.CancelledError):
+        return
+    await orchestrator.cleanup()
+
+
 # Create the main graph for langgraph-cli deployment
 # This is the entry point that langgraph-cli will use
 async def create_graph():
@@ -150,30 +366,33 @@ async def create_graph():
     
     This function is called by langgraph-cli to create the deployable graph.
     """
-    orchestrator = await create_agent_system()
+    orchestrator = await warmup()
     return orchestrator.agent
 
 
+# Begin connecting to MCP servers as soon as a long-lived server process imports this module
+warmup()
+
+
 # For direct execution and testing
 if __name__ == "__main__":
-    import asyncio
-    from langchain_core.messages import HumanMessage
+    logging.basicConfig(level=logging.INFO)
     
     async def main():
         """Main function for testing the agent system."""
-        print("Initializing WriteSense Agent system...")
+        logger.info("Initializing WriteSense Agent system...")
         
         # Create and initialize the agent system
         orchestrator = await create_agent_system()
         
-        print(f"Agent system initialized with capabilities:")
+        logger.info("Agent system initialized with capabilities:")
         capabilities = orchestrator.get_agent_capabilities()
         for agent_name, caps in capabilities.items():
-            print(f"  - {agent_name}: {caps['tool_count']} tools from {caps['servers']}")
+            logger.info("  - %s: %s tools from %s", agent_name, caps["tool_count"], caps["servers"])
         
         # Test query
         test_query = "Hello! Can you tell me what capabilities you have?"
-        print(f"\nTesting with query: {test_query}")
+        logger.info("Testing with query: %s", test_query)
         
         try:
             # Stream the response
@@ -182,15 +401,20 @@ if __name__ == "__main__":
                     if "messages" in data and data["messages"]:
                         message = data["messages"][-1]
                         if hasattr(message, "content"):
-                            print(f"[{node_name}] {message.content}")
+                            logger.info("[%s] %s", node_name, message.content)
         
         except Exception as e:
-            print(f"Error during execution: {e}")
+            logger.error("Error during execution: %s", e)
         
         finally:
             # Clean up
             await orchestrator.cleanup()
-            print("\nAgent system cleaned up.")
+            logger.info("Agent system cleaned up.")
     
-    # Run the test
-    asyncio.run(main()) 
\ No newline at end of file
+    # Run the test, on uvloop when it is installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main()) 
\ No newline at end of file